@@ -1,4 +1,4 @@
-import logging, os
+import logging, os, importlib
 
 LOGFORMAT = "%(module)s [%(levelname)s]: %(message)s"
 
@@ -10,6 +10,55 @@ if bool(os.environ.get("BLEAK_LOGGING", False)):
     handler.setFormatter(logging.Formatter(fmt=LOGFORMAT))
     _logger.addHandler(handler)
 
-from .service import dglab, dglab_v3
-from .bthandler_v2 import scan
-from .bthandler_v3 import scan
+# Public names resolve on first access, so `import pydglab` stays cheap
+# and bleak/bitstring are only loaded by the code paths that need them.
+_LAZY = {
+    "dglab": ("service", "dglab"),
+    "dglab_v3": ("service", "dglab_v3"),
+    "scan": ("bthandler_v3", "scan"),
+    "emergency_stop": ("safety", "emergency_stop"),
+}
+_SUBMODULES = (
+    "adapter",
+    "batch",
+    "bthandler_v2",
+    "bthandler_v3",
+    "cli",
+    "clock",
+    "events",
+    "loadtest",
+    "model_v2",
+    "model_v3",
+    "pattern",
+    "pipeline",
+    "player",
+    "recorder",
+    "rt",
+    "safety",
+    "scheduler",
+    "service",
+    "shm",
+    "telemetry",
+    "trace",
+    "uuid",
+    "virtual",
+    "waveform",
+)
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        module, attr = _LAZY[name]
+        value = getattr(importlib.import_module(f".{module}", __name__), attr)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY) | set(_SUBMODULES))
@@ -0,0 +1,3 @@
+from pydglab.cli import main
+
+raise SystemExit(main())
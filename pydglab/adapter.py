@@ -0,0 +1,172 @@
+"""
+Connections grouped by the Bluetooth adapter they go through.
+
+Devices on one adapter get their ticks spread evenly over the tick period,
+and their writes share one in-flight cap, so a dongle sees a steady stream
+instead of every device firing at once.
+
+A group is shared by every event loop in the process, e.g. devices on a
+DriverThread and on the main loop, so its window is guarded by a thread
+lock and waiters are woken on their own loop.
+"""
+
+import logging, asyncio, threading, time
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADAPTER = "default"
+
+
+class AdapterGroup(object):
+    def __init__(self, name: str, max_inflight: int = 4) -> None:
+        self.name = name
+        self.max_inflight = max_inflight
+        self.members: list = []
+        self.writes: int = 0
+        self._lock = threading.Lock()
+        # (loop, future) of the writes waiting for a free slot, in order.
+        self._waiters: deque[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._inflight: int = 0
+        self._busy: float = 0.0
+        self._busy_since: float = 0.0
+        self._started = time.monotonic()
+        return None
+
+    def set_max_inflight(self, max_inflight: int) -> None:
+        """
+        Change the in-flight cap, call it before any device on the adapter connects.
+        """
+        with self._lock:
+            if self._inflight or self._waiters:
+                raise Exception(
+                    f"Adapter {self.name}: writes are in flight, change the cap while it is idle"
+                )
+            self.max_inflight = max_inflight
+        return None
+
+    def join(self, device) -> None:
+        if device not in self.members:
+            self.members.append(device)
+            self._restagger()
+        return None
+
+    def leave(self, device) -> None:
+        if device in self.members:
+            self.members.remove(device)
+            self._restagger()
+        return None
+
+    def _restagger(self) -> None:
+        # Member i ticks i/n of the way into the period.
+        count = len(self.members)
+        for index, device in enumerate(self.members):
+            device.scheduler.set_phase(device.scheduler.period * index / count)
+        logger.debug(f"Adapter {self.name}: staggered {count} devices")
+
+    async def __aenter__(self) -> "AdapterGroup":
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._inflight < self.max_inflight and not self._waiters:
+                if self._inflight == 0:
+                    self._busy_since = time.monotonic()
+                self._inflight += 1
+                return self
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # The slot was handed over already, pass it on.
+            self._release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc) -> bool:
+        with self._lock:
+            self.writes += 1
+        self._release()
+        return False
+
+    def _release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                if loop.is_closed():
+                    continue
+                # The slot goes to the waiter as is, the in-flight count stays.
+                loop.call_soon_threadsafe(_wake, future)
+                return None
+            self._inflight -= 1
+            if self._inflight == 0:
+                self._busy += time.monotonic() - self._busy_since
+        return None
+
+    def utilization(self) -> dict:
+        """
+        获取适配器利用率。
+        Get adapter utilization since the last reset.
+
+        Returns:
+            dict: devices, writes, writes_per_second, busy (有写入在途的时间占比),
+                sustainable_devices (按当前占比估算的设备上限)
+        """
+        now = time.monotonic()
+        busy = self._busy + (now - self._busy_since if self._inflight else 0.0)
+        elapsed = max(now - self._started, 1e-9)
+        busy /= elapsed
+        return {
+            "devices": len(self.members),
+            "writes": self.writes,
+            "writes_per_second": self.writes / elapsed,
+            "busy": busy,
+            "sustainable_devices": int(len(self.members) / busy) if busy else None,
+        }
+
+    def reset(self) -> None:
+        self.writes = 0
+        self._busy = 0.0
+        self._busy_since = time.monotonic()
+        self._started = time.monotonic()
+        return None
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+_groups: dict[str, AdapterGroup] = {}
+
+
+def group(adapter: Optional[str] = None) -> AdapterGroup:
+    """
+    获取适配器分组，不存在时创建。
+    Get the group of an adapter, created on first use.
+
+    Args:
+        adapter (str): 适配器名称，例如hci0，None为系统默认适配器
+
+    Returns:
+        AdapterGroup: 适配器分组
+    """
+    name = adapter or DEFAULT_ADAPTER
+    if name not in _groups:
+        _groups[name] = AdapterGroup(name)
+    return _groups[name]
+
+
+def utilization() -> dict:
+    """
+    获取所有适配器的利用率。
+    Get utilization of every adapter.
+
+    Returns:
+        dict: {适配器名称: 利用率}
+    """
+    return {name: group.utilization() for name, group in _groups.items()}
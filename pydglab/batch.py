@@ -0,0 +1,145 @@
+import logging, asyncio, copy, functools
+from typing import Any, Callable
+
+from pydglab.waveform import WaveSetSlot
+
+logger = logging.getLogger(__name__)
+
+
+def batchable(func: Callable) -> Callable:
+    """
+    Stage calls to a setter while a batch is open on the device.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        if self._batch is not None:
+            self._batch.calls.append((func, args, kwargs))
+            return None
+        return await func(self, *args, **kwargs)
+
+    # Lets a DriverThread proxy stage the call on the host side.
+    wrapper.batchable = True
+    return wrapper
+
+
+class Batch(object):
+    """
+    `async with device.batch():` stages every setter call made inside it.
+
+    On exit the staged calls are applied together on the next tick boundary,
+    and that tick carries the minimal set of packets for the change, so the
+    device never sees a half-applied state. Exiting waits for that tick.
+    Setters return None while staged.
+
+    Wave sets staged without a switchover mode switch immediately, so they
+    play on that same tick. If any staged call fails, the ones before it are
+    rolled back and exiting raises.
+    """
+
+    def __init__(self, device) -> None:
+        self.device = device
+        self.calls: list[tuple[Callable, tuple, dict]] = []
+        self.committed: asyncio.Future = None
+        return None
+
+    async def __aenter__(self) -> "Batch":
+        if self.device._batch is not None:
+            raise Exception("A batch is already open on this device")
+        self.device._batch = self
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        self.device._batch = None
+        if exc_type is not None or not self.calls:
+            return False
+        ticking = self.device.scheduler.task
+        if ticking is None or ticking.done():
+            raise Exception("No tick loop is running on this device, call create() first")
+        self.committed = asyncio.get_running_loop().create_future()
+        self.device._pending_batches.append(self)
+        try:
+            await asyncio.wait((self.committed, ticking), return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            self.committed.cancel()
+            raise
+        if not self.committed.done():
+            self.committed.cancel()
+            raise Exception("The tick loop stopped before the batch was applied")
+        self.committed.result()
+        return False
+
+
+def _fields(channel) -> list[str]:
+    return [name for cls in type(channel).__mro__ for name in getattr(cls, "__slots__", ())]
+
+
+def _checkpoint(device) -> tuple:
+    """
+    Everything a staged setter may change, to roll a failed batch back.
+    """
+    channels = [
+        (channel, {name: copy.copy(getattr(channel, name)) for name in _fields(channel)})
+        for channel in (device.coyote.ChannelA, device.coyote.ChannelB)
+    ]
+    slots = {
+        slot.attr: getattr(device, slot.attr)
+        for slot in vars(type(device)).values()
+        if isinstance(slot, WaveSetSlot)
+    }
+    players = [(player, player._request) for player in (device.channelA_player, device.channelB_player)]
+    return channels, slots, players, set(device._dirty)
+
+
+def _restore(device, checkpoint: tuple) -> None:
+    channels, slots, players, dirty = checkpoint
+    for channel, fields in channels:
+        for name, value in fields.items():
+            setattr(channel, name, value)
+    for attr, value in slots.items():
+        setattr(device, attr, value)
+    for player, request in players:
+        player._request = request
+    device._dirty = dirty
+
+
+async def apply_(device) -> tuple[set[str], list[Batch]]:
+    """
+    Apply the pending batches on `device` with writes deferred.
+
+    Returns the names of the packets the setters wanted to write,
+    and the applied batches, to be passed to `commit_`.
+    """
+    batches, device._pending_batches = device._pending_batches, []
+    device._deferring = True
+    try:
+        for batch in batches:
+            if batch.committed.done():
+                # Cancelled while waiting for its tick.
+                continue
+            checkpoint = _checkpoint(device)
+            try:
+                for func, args, kwargs in batch.calls:
+                    await func(device, *args, **kwargs)
+            except Exception as e:
+                logger.error(f"Batch failed to apply, rolled back: {e}")
+                _restore(device, checkpoint)
+                if not batch.committed.done():
+                    batch.committed.set_exception(e)
+    finally:
+        device._deferring = False
+    dirty, device._dirty = device._dirty, set()
+    return dirty, batches
+
+
+def commit_(batches: list[Batch], exc: BaseException = None) -> None:
+    """
+    Resolve the batches once their tick has been written.
+    """
+    for batch in batches:
+        if batch.committed.done():
+            continue
+        if exc is None:
+            batch.committed.set_result(None)
+        else:
+            batch.committed.set_exception(exc)
@@ -1,10 +1,11 @@
-import logging
+import logging, asyncio
 from bleak import BleakClient, BleakScanner
 from typing import Tuple, List
 from bitstring import BitArray
 
 from pydglab.model_v2 import *
 from pydglab.uuid import *
+from pydglab import trace
 
 logger = logging.getLogger(__name__)
 
@@ -46,10 +47,27 @@ async def get_batterylevel_(client: BleakClient, characteristics: CoyoteV2):
 async def get_strength_(client: BleakClient, characteristics: CoyoteV2):
     r = await client.read_gatt_char(characteristics.characteristicEStimPower)
     # logger.debug(f"Received strenth bytes: {r.hex()} , which is {r}")
+    return decode_strength_(r)
+
+
+async def notify_strength_(
+    client: BleakClient, characteristics: CoyoteV2, callback: callable
+) -> bool:
+    # Not every firmware notifies on the power characteristic.
+    properties = getattr(characteristics.characteristicEStimPower, "properties", ())
+    if "notify" not in properties:
+        return False
+    await client.start_notify(characteristics.characteristicEStimPower, callback)
+    return True
+
+
+def decode_strength_(data: bytearray) -> Tuple[int, int]:
+    r = bytearray(data)
     r.reverse()
     r = BitArray(r).bin
     # logger.debug(f"Received strenth bytes after decoding: {r}")
-    return int(int(r[-22:-11], 2) / 2047 * 200), int(int(r[-11:], 2) / 2047 * 200)
+    # Rounded, so it inverts the truncation in set_strength_.
+    return round(int(r[-22:-11], 2) / 2047 * 200), round(int(r[-11:], 2) / 2047 * 200)
 
 
 async def set_strength_(
@@ -73,13 +91,15 @@ async def set_strength_(
     ):
         value.ChannelB.strength = 0
 
-    array = ((strengthA << 11) + strengthB).to_bytes(3, byteorder="little")
+    with trace.span("encode", "v2", client.address, characteristic="power"):
+        array = ((strengthA << 11) + strengthB).to_bytes(3, byteorder="little")
 
     # logger.debug(f"Sending bytes: {array.hex()} , which is {array}")
 
-    r = await client.write_gatt_char(
-        characteristics.characteristicEStimPower, bytearray(array), response=False
-    )
+    with trace.span("write_gatt_char", "v2", client.address, characteristic="power"):
+        r = await client.write_gatt_char(
+            characteristics.characteristicEStimPower, bytearray(array), response=False
+        )
     return value.ChannelA.strength, value.ChannelB.strength
 
 
@@ -89,19 +109,35 @@ async def set_wave_(
     characteristics: CoyoteV2,
 ):
     # Create a byte array with the wave values.
-    array = ((value.waveZ << 15) + (value.waveY << 5) + value.waveX).to_bytes(
-        3, byteorder="little"
-    )
+    with trace.span("encode", "v2", client.address, characteristic=value.name):
+        array = ((value.waveZ << 15) + (value.waveY << 5) + value.waveX).to_bytes(
+            3, byteorder="little"
+        )
 
     # logger.debug(f"Sending bytes: {array.hex()} , which is {array}")
 
-    r = await client.write_gatt_char(
-        (
-            characteristics.characteristicEStimA
-            if type(value) is ChannelA
-            else characteristics.characteristicEStimB
-        ),
-        bytearray(array),
-        response=False,
-    )
+    with trace.span("write_gatt_char", "v2", client.address, characteristic=value.name):
+        r = await client.write_gatt_char(
+            (
+                characteristics.characteristicEStimA
+                if type(value) is ChannelA
+                else characteristics.characteristicEStimB
+            ),
+            bytearray(array),
+            response=False,
+        )
     return value.waveX, value.waveY, value.waveZ
+
+
+async def write_stop_(client: BleakClient, characteristics: CoyoteV2):
+    # Zero power and zero pulses on both channels, straight to the client,
+    # independent of any queued state.
+    zero = bytearray(3)
+    with trace.span("write_gatt_char", "v2", client.address, characteristic="stop"):
+        await asyncio.gather(
+            client.write_gatt_char(
+                characteristics.characteristicEStimPower, zero, response=False
+            ),
+            client.write_gatt_char(characteristics.characteristicEStimA, zero, response=False),
+            client.write_gatt_char(characteristics.characteristicEStimB, zero, response=False),
+        )
@@ -5,6 +5,7 @@ from bitstring import BitArray
 
 from pydglab.model_v3 import *
 from pydglab.uuid import *
+from pydglab import trace
 
 logger = logging.getLogger(__name__)
 
@@ -42,48 +43,60 @@ async def notify_(client: BleakClient, characteristics: CoyoteV3, callback: call
     await client.start_notify(characteristics.characteristicNotify, callback)
 
 
+async def get_batterylevel_(client: BleakClient, characteristics: CoyoteV3):
+    r = await client.read_gatt_char(characteristics.characteristicBattery)
+    return r
+
+
 async def write_strenth_(
     client: BleakClient, value: Coyote, characteristics: CoyoteV3
 ):
-    struct = (
-        0xB0,
-        0b00010000 + 0b00001111,
-        value.ChannelA.strength,
-        value.ChannelB.strength,
-        value.ChannelA.wave,
-        value.ChannelA.waveStrenth,
-        value.ChannelB.wave,
-        value.ChannelB.waveStrenth,
-    )
-    bytes_ = bytes(
-        tuple(
-            item if isinstance(item, int) else subitem
-            for item in struct
-            for subitem in (tuple(item) if isinstance(item, list) else (item,))
+    with trace.span("encode", "v3", client.address, packet="B0"):
+        bytes_ = (
+            bytes(
+                (
+                    0xB0,
+                    0b00010000 + 0b00001111,
+                    value.ChannelA.strength,
+                    value.ChannelB.strength,
+                )
+            )
+            + bytes(value.ChannelA.wave)
+            + bytes(value.ChannelA.waveStrenth)
+            + bytes(value.ChannelB.wave)
+            + bytes(value.ChannelB.waveStrenth)
         )
-    )
     logger.debug(f"Sending bytes: {bytes_.hex()} , which is {bytes_}")
-    await client.write_gatt_char(characteristics.characteristicWrite, bytes_)
+    with trace.span("write_gatt_char", "v3", client.address, packet="B0"):
+        await client.write_gatt_char(characteristics.characteristicWrite, bytes_)
 
 
 async def write_coefficient_(
     client: BleakClient, value: Coyote, characteristics: CoyoteV3
 ):
-    struct = (
-        0xBF,
-        value.ChannelA.limit,
-        value.ChannelB.limit,
-        value.ChannelA.coefficientFrequency,
-        value.ChannelB.coefficientFrequency,
-        value.ChannelA.coefficientStrenth,
-        value.ChannelB.coefficientStrenth,
-    )
-    bytes_ = bytes(
-        tuple(
-            item if isinstance(item, int) else subitem
-            for item in struct
-            for subitem in (item if isinstance(item, tuple) else (item,))
+    with trace.span("encode", "v3", client.address, packet="BF"):
+        bytes_ = bytes(
+            (
+                0xBF,
+                value.ChannelA.limit,
+                value.ChannelB.limit,
+                value.ChannelA.coefficientFrequency,
+                value.ChannelB.coefficientFrequency,
+                value.ChannelA.coefficientStrenth,
+                value.ChannelB.coefficientStrenth,
+            )
         )
-    )
     logger.debug(f"Sending bytes: {bytes_.hex()} , which is {bytes_}")
-    await client.write_gatt_char(characteristics.characteristicWrite, bytes_)
+    with trace.span("write_gatt_char", "v3", client.address, packet="BF"):
+        await client.write_gatt_char(characteristics.characteristicWrite, bytes_)
+
+
+async def write_stop_(client: BleakClient, characteristics: CoyoteV3):
+    # Zero strength and zero intensity on both channels, built from constants
+    # so it does not depend on the state the tick loop is working on.
+    bytes_ = bytes((0xB0, 0b00010000 + 0b00001111, 0, 0)) + (
+        bytes((10, 10, 10, 10)) + bytes(4)
+    ) * 2
+    logger.debug(f"Sending bytes: {bytes_.hex()} , which is {bytes_}")
+    with trace.span("write_gatt_char", "v3", client.address, packet="stop"):
+        await client.write_gatt_char(characteristics.characteristicWrite, bytes_)
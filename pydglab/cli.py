@@ -0,0 +1,203 @@
+"""
+Command line entry point, `pydglab <command>`.
+
+Only argparse is imported up front, every command imports what it needs,
+so asyncio, bleak and bitstring are not paid for by `--help` or `bench`.
+"""
+
+import argparse, logging
+
+from pydglab import LOGFORMAT
+
+logger = logging.getLogger(__name__)
+
+
+async def _scan(args) -> int:
+    found = []
+    if args.device in ("2", "all"):
+        from pydglab.bthandler_v2 import scan
+
+        found += [("v2", *device) for device in await scan()]
+    if args.device in ("3", "all"):
+        from pydglab.bthandler_v3 import scan
+
+        found += [("v3", *device) for device in await scan()]
+    for version, address, rssi in sorted(found, key=lambda device: -device[2]):
+        print(f"{version}\t{address}\t{rssi}")
+    return 0 if found else 1
+
+
+async def _connect(args):
+    from pydglab.service import dglab, dglab_v3
+
+    instance = (dglab if args.device == "2" else dglab_v3)(args.address)
+    await instance.create()
+    return instance
+
+
+async def _status(args) -> int:
+    instance = await _connect(args)
+    try:
+        await instance.get_batterylevel()
+        for field, value in instance.get_state()._asdict().items():
+            print(f"{field}\t{value}")
+    finally:
+        await instance.close()
+    return 0
+
+
+def _load_recording(path: str) -> dict:
+    # A recording is {"A": [...], "B": [...]}, items are (x, y, z) wave tuples,
+    # or (frequency, intensity) v3 sub-frames.
+    import json
+
+    with open(path, "r", encoding="utf-8") as f:
+        recording = json.load(f)
+    return {
+        channel: [tuple(item) for item in recording.get(channel, ())]
+        for channel in ("A", "B")
+    }
+
+
+def _models(args):
+    if args.device == "2":
+        from pydglab import model_v2
+
+        return model_v2
+    from pydglab import model_v3
+
+    return model_v3
+
+
+async def _play(args) -> int:
+    import asyncio
+
+    models = _models(args)
+    if args.file is not None:
+        recording = _load_recording(args.file)
+    else:
+        recording = {"A": models.Wave_set[args.wave], "B": models.Wave_set[args.wave]}
+
+    instance = await _connect(args)
+    try:
+        for name, sequence in recording.items():
+            if not sequence:
+                continue
+            channel = getattr(models, f"Channel{name}")
+            if len(sequence[0]) == 2:
+                if args.device == "2":
+                    raise Exception("Sub-frame recordings need a DGLAB v3.0")
+                await instance.set_frame_set(sequence, channel)
+            else:
+                await instance.set_wave_set(sequence, channel)
+        await instance.set_strength_sync(*args.strength)
+        await asyncio.sleep(args.duration)
+        await instance.set_strength_sync(0, 0)
+    finally:
+        await instance.close()
+    return 0
+
+
+def _cold_start(statement: str, runs: int) -> float:
+    # Every run is a fresh interpreter, so nothing is cached in sys.modules.
+    import subprocess, sys, time
+
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True)
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)[len(timings) // 2]
+
+
+def _bench(args) -> int:
+    baseline = _cold_start("pass", args.runs)
+    print(f"interpreter\t{baseline * 1000:.1f}ms")
+    for statement in (
+        "import pydglab",
+        "import pydglab.cli",
+        "import pydglab.service",
+    ):
+        elapsed = _cold_start(statement, args.runs) - baseline
+        print(f"{statement}\t{elapsed * 1000:.1f}ms")
+    return 0
+
+
+async def _loadtest(args) -> int:
+    from pydglab import loadtest
+
+    reports = await loadtest.scaling_curve(
+        args.devices,
+        version=int(args.device),
+        duration=args.duration,
+        latency=args.latency,
+        jitter=args.jitter,
+        drop_rate=args.drop_rate,
+        adapters=args.adapters,
+    )
+    print(loadtest.format_reports(reports))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="pydglab", description="A Third-party DGLAB Python Driver"
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    parser.add_argument("--trace", default=None, help="write a Chrome trace to this file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan = commands.add_parser("scan", help="scan for devices")
+    scan.add_argument("-d", "--device", choices=("2", "3", "all"), default="all")
+
+    for name, help in (
+        ("status", "connect and print device state"),
+        ("play", "play a wave set or a recording"),
+    ):
+        command = commands.add_parser(name, help=help)
+        command.add_argument("-d", "--device", choices=("2", "3"), default="3")
+        command.add_argument("-a", "--address", default=None)
+        if name == "play":
+            source = command.add_mutually_exclusive_group()
+            source.add_argument("-w", "--wave", default="Going_Faster")
+            source.add_argument("-f", "--file", default=None)
+            command.add_argument(
+                "-s", "--strength", type=int, nargs=2, default=(1, 1), metavar=("A", "B")
+            )
+            command.add_argument("-t", "--duration", type=float, default=5.0)
+
+    bench = commands.add_parser("bench", help="measure cold start time")
+    bench.add_argument("-n", "--runs", type=int, default=5)
+
+    load = commands.add_parser("loadtest", help="drive virtual devices and report scaling")
+    load.add_argument("-d", "--device", choices=("2", "3"), default="3")
+    load.add_argument("-n", "--devices", type=int, nargs="+", default=(1, 10, 100, 1000))
+    load.add_argument("-t", "--duration", type=float, default=10.0)
+    load.add_argument("--latency", type=float, default=0.0075)
+    load.add_argument("--jitter", type=float, default=0.0)
+    load.add_argument("--drop-rate", type=float, default=0.0)
+    load.add_argument("--adapters", type=int, default=1)
+    return parser
+
+
+def main(argv: list[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        format=LOGFORMAT, level=logging.DEBUG if args.verbose else logging.WARNING
+    )
+    if args.command == "bench":
+        return _bench(args)
+    import asyncio
+
+    if args.trace is not None:
+        from pydglab import trace
+
+        trace.enable(args.trace)
+    command = {"scan": _scan, "status": _status, "play": _play, "loadtest": _loadtest}[
+        args.command
+    ]
+    try:
+        return asyncio.run(command(args))
+    finally:
+        if args.trace is not None:
+            trace.disable()
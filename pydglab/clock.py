@@ -0,0 +1,129 @@
+"""
+Time source for the scheduler, telemetry, timers and devices.
+
+Everything that reads the time or sleeps takes a `clock`, `system` by
+default. A VirtualClock runs its own event loop whose time only moves
+when every task is waiting, and then jumps straight to the next timer,
+so a 30 minute session on virtual devices takes as long as its CPU work:
+
+    clock = VirtualClock()
+
+    async def session():
+        device = await dglab_v3("virtual", client=VirtualClient("virtual"), clock=clock).create()
+        ...
+        await asyncio.sleep(1800)
+
+    clock.run(session())
+"""
+
+import logging, asyncio, selectors, time
+from typing import Awaitable
+
+logger = logging.getLogger(__name__)
+
+
+class Clock(object):
+    """
+    Real time.
+    """
+
+    def time(self) -> float:
+        """
+        Wall clock time, for timestamps.
+        """
+        return time.time()
+
+    def monotonic(self) -> float:
+        """
+        Monotonic time, for deadlines and intervals.
+        """
+        return time.monotonic()
+
+    async def sleep(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+
+
+system = Clock()
+
+
+class _VirtualSelector(selectors.BaseSelector):
+    """
+    Polls real I/O without blocking, and advances the clock instead of waiting for a timer.
+    """
+
+    def __init__(self, clock: "VirtualClock") -> None:
+        self._clock = clock
+        self._selector = selectors.DefaultSelector()
+
+    def register(self, fileobj, events, data=None):
+        return self._selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self._selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self._selector.modify(fileobj, events, data)
+
+    def get_map(self):
+        return self._selector.get_map()
+
+    def close(self) -> None:
+        self._selector.close()
+
+    def select(self, timeout=None):
+        events = self._selector.select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None:
+            # No timer pending, only another thread can wake the loop up.
+            return self._selector.select(None)
+        self._clock.advance(timeout)
+        return []
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    def __init__(self, clock: "VirtualClock") -> None:
+        super().__init__(_VirtualSelector(clock))
+        self.clock = clock
+
+    def time(self) -> float:
+        return self.clock.monotonic()
+
+
+class VirtualClock(Clock):
+    """
+    Simulated time, advanced by its event loop whenever the loop would otherwise wait.
+    Runs are deterministic, with `epoch` as the wall clock time at start.
+    """
+
+    def __init__(self, start: float = 0.0, epoch: float = 0.0) -> None:
+        self.now = start
+        self.epoch = epoch
+        return None
+
+    def time(self) -> float:
+        return self.epoch + self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, delay: float) -> None:
+        self.now += delay
+        return None
+
+    async def sleep(self, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        if getattr(loop, "clock", None) is not self:
+            raise Exception("VirtualClock only runs on its own loop, use clock.run()")
+        await asyncio.sleep(delay)
+
+    def new_event_loop(self) -> VirtualEventLoop:
+        return VirtualEventLoop(self)
+
+    def run(self, main: Awaitable):
+        """
+        在虚拟时间中运行协程，类似asyncio.run。
+        Run a coroutine in virtual time, like asyncio.run().
+        """
+        with asyncio.Runner(loop_factory=self.new_event_loop) as runner:
+            return runner.run(main)
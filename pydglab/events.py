@@ -0,0 +1,170 @@
+"""
+Device event stream with multi-subscriber fan-out.
+
+Every device owns an EventHub (`device.events`) that forwards to the
+process-wide `hub`, so consumers can subscribe per device or across all:
+
+    async for event in dglab_instance.events.subscribe():
+        print(event.kind, event.data)
+
+Events are immutable and the same object is handed to every subscriber.
+Publishing never waits: each subscriber has its own bounded buffer and
+an overflow policy, so a slow consumer only ever hurts itself.
+"""
+
+import logging, asyncio, threading
+from collections import deque
+from typing import Any, NamedTuple, Optional
+
+from pydglab.clock import Clock, system
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "close")
+
+
+class DeviceEvent(NamedTuple):
+    address: str
+    # strength, limits, battery, disconnect, emergency_stop
+    kind: str
+    data: Any
+    timestamp: float
+
+
+class SubscriberLagged(Exception):
+    pass
+
+
+class Subscription(object):
+    """
+    One consumer's view of a hub, iterate it with `async for`.
+    """
+
+    def __init__(self, hub: "EventHub", maxsize: int, overflow: str, kinds) -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow}, use one of {OVERFLOW_POLICIES}")
+        self.hub = hub
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.kinds = None if kinds is None else frozenset(kinds)
+        self.dropped: int = 0
+        self.closed: bool = False
+        self._buffer: deque[DeviceEvent] = deque()
+        self._ready = asyncio.Event()
+        self._lagged = False
+        # Devices may publish from a DriverThread, events are handed to the loop
+        # the subscriber reads on, known once get() is first called.
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop = None
+        self._thread: int = None
+        return None
+
+    def _offer(self, event: DeviceEvent) -> None:
+        with self._lock:
+            if self._loop is None:
+                # Nobody is waiting yet, buffering is all there is to do.
+                return self._offer_local(event)
+        if threading.get_ident() != self._thread:
+            self._loop.call_soon_threadsafe(self._offer_local, event)
+            return None
+        return self._offer_local(event)
+
+    def _offer_local(self, event: DeviceEvent) -> None:
+        if self.closed or (self.kinds is not None and event.kind not in self.kinds):
+            return None
+        if len(self._buffer) >= self.maxsize:
+            self.dropped += 1
+            if self.overflow == "drop_newest":
+                return None
+            if self.overflow == "close":
+                logger.warning(f"Subscriber lagged behind {self.maxsize} events, closing it")
+                self._lagged = True
+                self.close()
+                return None
+            self._buffer.popleft()
+        self._buffer.append(event)
+        self._ready.set()
+        return None
+
+    async def get(self) -> DeviceEvent:
+        """
+        等待下一个事件。
+        Wait for the next event.
+
+        Raises:
+            StopAsyncIteration: 订阅已关闭
+            SubscriberLagged: 订阅因处理过慢被关闭(overflow为close时)
+        """
+        if self._loop is None:
+            with self._lock:
+                self._loop = asyncio.get_running_loop()
+                self._thread = threading.get_ident()
+        while not self._buffer:
+            if self.closed:
+                if self._lagged:
+                    raise SubscriberLagged(f"Dropped after {self.dropped} events")
+                raise StopAsyncIteration
+            self._ready.clear()
+            await self._ready.wait()
+        return self._buffer.popleft()
+
+    def get_nowait(self) -> Optional[DeviceEvent]:
+        return self._buffer.popleft() if self._buffer else None
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> DeviceEvent:
+        return await self.get()
+
+    def close(self) -> None:
+        """
+        取消订阅。
+        Unsubscribe, events already buffered can still be read.
+        """
+        self.closed = True
+        self.hub._subscribers.discard(self)
+        self._ready.set()
+        return None
+
+
+class EventHub(object):
+    def __init__(self, parent: "EventHub" = None, clock: Clock = None) -> None:
+        self.parent = parent
+        self.clock = clock or system
+        self._subscribers: set[Subscription] = set()
+        return None
+
+    def subscribe(
+        self, maxsize: int = 256, overflow: str = "drop_oldest", kinds=None
+    ) -> Subscription:
+        """
+        订阅事件。
+        Subscribe to events.
+
+        Args:
+            maxsize (int): 缓冲区大小
+            overflow (str): 缓冲区满时的策略，drop_oldest，drop_newest或close
+            kinds (Iterable[str]): 只接收这些类型的事件，默认全部
+
+        Returns:
+            Subscription: 订阅
+        """
+        subscription = Subscription(self, maxsize, overflow, kinds)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def publish(self, address: str, kind: str, data: Any = ()) -> DeviceEvent:
+        event = DeviceEvent(address, kind, data, self.clock.time())
+        self._fan_out(event)
+        return event
+
+    def _fan_out(self, event: DeviceEvent) -> None:
+        for subscription in tuple(self._subscribers):
+            subscription._offer(event)
+        if self.parent is not None:
+            self.parent._fan_out(event)
+
+
+# Every device hub forwards here.
+hub = EventHub()
@@ -0,0 +1,188 @@
+"""
+Load generator, drives many virtual devices through dglab/dglab_v3.
+
+    reports = asyncio.run(loadtest.scaling_curve((10, 100, 1000), version=3))
+    print(loadtest.format_reports(reports))
+
+Every device is a real driver instance on a pydglab.virtual.VirtualClient,
+so ticks, the write pipeline, adapter groups and notifications all run as
+they would against hardware, only the radio is simulated.
+"""
+
+import logging, asyncio, gc, time, tracemalloc
+from typing import Iterable, NamedTuple
+
+import pydglab.adapter as adapter_
+from pydglab.scheduler import percentile
+from pydglab.virtual import VirtualClient
+
+logger = logging.getLogger(__name__)
+
+
+class LoadReport(NamedTuple):
+    devices: int
+    version: int
+    tick_period: float
+    duration: float
+    ticks: int
+    skipped: int
+    writes: int
+    dropped: int
+    # Ticks per second over all devices.
+    throughput: float
+    lateness_p50: float
+    lateness_p99: float
+    lateness_max: float
+    # Traced Python allocations after connecting and warming up, in bytes.
+    memory_per_device: float
+    # Process CPU time per device per second of wall time.
+    cpu_per_device: float
+
+
+def _driver(version: int):
+    from pydglab.service import dglab, dglab_v3
+
+    return dglab if version == 2 else dglab_v3
+
+
+async def run(
+    devices: int = 100,
+    version: int = 3,
+    duration: float = 10.0,
+    latency: float = 0.0075,
+    jitter: float = 0.0,
+    drop_rate: float = 0.0,
+    tick_period: float = 0.1,
+    adapters: int = 1,
+    max_inflight: int = 4,
+    warmup: float = 1.0,
+    seed: int = None,
+) -> LoadReport:
+    """
+    运行一次负载测试。
+    Run one load test.
+
+    Args:
+        devices (int): 虚拟设备数量
+        version (int): 2或3
+        duration (float): 测量时长(秒)
+        latency (float): 每次写入的模拟延迟(秒)
+        jitter (float): 额外的随机延迟上限(秒)
+        drop_rate (float): 写入丢失概率
+        tick_period (float): tick周期(秒)
+        adapters (int): 设备平均分配到的虚拟适配器数量
+        max_inflight (int): 每个适配器的在途写入上限
+        warmup (float): 开始测量前的预热时长(秒)
+        seed (int): 随机种子
+
+    Returns:
+        LoadReport: 测试结果
+    """
+    from pydglab import model_v2, model_v3
+
+    models = model_v2 if version == 2 else model_v3
+    names = [f"virtual{index}" for index in range(adapters)]
+    for name in names:
+        adapter_.group(name).set_max_inflight(max_inflight)
+
+    driver = _driver(version)
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    fleet = await asyncio.gather(
+        *(
+            driver(
+                f"virtual-{version}-{index}",
+                tick_period=tick_period,
+                adapter=names[index % adapters],
+                client=VirtualClient(
+                    f"virtual-{version}-{index}",
+                    version=version,
+                    latency=latency,
+                    jitter=jitter,
+                    drop_rate=drop_rate,
+                    seed=None if seed is None else seed + index,
+                ),
+            ).create()
+            for index in range(devices)
+        )
+    )
+    try:
+        for device in fleet:
+            await device.set_wave_set(models.Wave_set["Going_Faster"], models.ChannelA)
+            await device.set_wave_set(models.Wave_set["Going_Faster"], models.ChannelB)
+            await device.set_strength_sync(10, 10)
+        await asyncio.sleep(warmup)
+        gc.collect()
+        memory = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+        # Only what happens inside the window is measured.
+        for device in fleet:
+            device.scheduler.ticks = 0
+            device.scheduler.skipped = 0
+            device.scheduler.lateness.clear()
+        for name in names:
+            adapter_.group(name).reset()
+        writes = sum(device.client.writes for device in fleet)
+        dropped = sum(device.client.dropped for device in fleet)
+        cpu, wall = time.process_time(), time.perf_counter()
+        await asyncio.sleep(duration)
+        cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        await asyncio.gather(*(device.close() for device in fleet))
+
+    lateness = [value for device in fleet for value in device.scheduler.lateness]
+    ticks = sum(device.scheduler.ticks for device in fleet)
+    return LoadReport(
+        devices=devices,
+        version=version,
+        tick_period=tick_period,
+        duration=wall,
+        ticks=ticks,
+        skipped=sum(device.scheduler.skipped for device in fleet),
+        writes=sum(device.client.writes for device in fleet) - writes,
+        dropped=sum(device.client.dropped for device in fleet) - dropped,
+        throughput=ticks / wall,
+        lateness_p50=percentile(lateness, 50),
+        lateness_p99=percentile(lateness, 99),
+        lateness_max=max(lateness, default=0.0),
+        memory_per_device=memory / devices,
+        cpu_per_device=cpu / wall / devices,
+    )
+
+
+async def scaling_curve(counts: Iterable[int] = (1, 10, 100, 1000), **kwargs) -> list[LoadReport]:
+    """
+    依次以不同设备数量运行负载测试。
+    Run the load test once per device count, other arguments go to run().
+
+    Returns:
+        list[LoadReport]: 每个设备数量的测试结果
+    """
+    reports = []
+    for devices in counts:
+        report = await run(devices, **kwargs)
+        logger.info(f"{devices} devices: {report.throughput:.0f} ticks/s")
+        reports.append(report)
+    return reports
+
+
+def format_reports(reports: Iterable[LoadReport]) -> str:
+    """
+    Format reports as a table, one row per run.
+    """
+    rows = [
+        "devices\tticks/s\texpected\tskipped\tdropped\tp50(ms)\tp99(ms)\tmax(ms)\tKiB/dev\tCPU%/dev"
+    ]
+    for report in reports:
+        expected = report.devices / report.tick_period
+        rows.append(
+            f"{report.devices}\t{report.throughput:.0f}\t{expected:.0f}\t{report.skipped}"
+            f"\t{report.dropped}\t{report.lateness_p50 * 1000:.2f}"
+            f"\t{report.lateness_p99 * 1000:.2f}\t{report.lateness_max * 1000:.2f}"
+            f"\t{report.memory_per_device / 1024:.1f}\t{report.cpu_per_device * 100:.3f}"
+        )
+    return "\n".join(rows)
@@ -1,30 +1,61 @@
-from typing import Optional
+from typing import NamedTuple, Optional, Tuple
 
 
-class ChannelA(object):
-    def __init__(self):
-        self.strength: Optional[int] = None
-        self.wave: Optional[bytearray[int]] = bytearray((0, 0, 0))
-        self.waveX: Optional[int] = self.wave[0]
-        self.waveY: Optional[int] = self.wave[1]
-        self.waveZ: Optional[int] = self.wave[2]
+class Channel(object):
+    """
+    Channel state, ChannelA and ChannelB only differ in `name`.
+    """
 
+    __slots__ = ("strength", "waveX", "waveY", "waveZ")
+    name: str = None
 
-class ChannelB(object):
     def __init__(self):
         self.strength: Optional[int] = None
-        self.wave: Optional[bytearray[int]] = bytearray((0, 0, 0))
-        self.waveX: Optional[int] = self.wave[0]
-        self.waveY: Optional[int] = self.wave[1]
-        self.waveZ: Optional[int] = self.wave[2]
+        self.waveX: Optional[int] = 0
+        self.waveY: Optional[int] = 0
+        self.waveZ: Optional[int] = 0
+
+    @property
+    def wave(self) -> bytearray:
+        return bytearray((self.waveX, self.waveY, self.waveZ))
+
+
+class ChannelA(Channel):
+    __slots__ = ()
+    name = "A"
+
+
+class ChannelB(Channel):
+    __slots__ = ()
+    name = "B"
+
+
+class CoyoteState(NamedTuple):
+    strengthA: Optional[int]
+    strengthB: Optional[int]
+    waveA: Tuple[int, int, int]
+    waveB: Tuple[int, int, int]
+    battery: Optional[int]
 
 
 class Coyote(object):
+    __slots__ = ("ChannelA", "ChannelB", "Battery")
+
     def __init__(self):
         self.ChannelA: ChannelA = ChannelA()
         self.ChannelB: ChannelB = ChannelB()
         self.Battery: Optional[int] = None
 
+    def snapshot(self) -> CoyoteState:
+        a, b = self.ChannelA, self.ChannelB
+        return CoyoteState(
+            a.strength,
+            b.strength,
+            (a.waveX, a.waveY, a.waveZ),
+            (b.waveX, b.waveY, b.waveZ),
+            self.Battery,
+        )
+
 
 Wave_set = {
     "Going_Faster": [
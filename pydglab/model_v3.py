@@ -1,30 +1,76 @@
-from typing import Optional
+from array import array
+from typing import NamedTuple, Optional, Tuple
 
 
-class ChannelA(object):
-    def __init__(self):
-        self.strength: Optional[int] = None
-        self.wave: Optional[list[int]] = [0, 0, 0, 0]
-        self.waveStrenth: Optional[list[int]] = [0, 0, 0, 0]
-        self.coefficientStrenth: Optional[int] = None
-        self.coefficientFrequency: Optional[int] = None
-        self.limit: Optional[int] = None
+class Channel(object):
+    """
+    Channel state, ChannelA and ChannelB only differ in `name`.
+
+    `wave` and `waveStrenth` hold the four 25ms sub-frames of a 0xB0 packet.
+    """
 
+    __slots__ = (
+        "strength",
+        "wave",
+        "waveStrenth",
+        "coefficientStrenth",
+        "coefficientFrequency",
+        "limit",
+    )
+    name: str = None
 
-class ChannelB(object):
     def __init__(self):
         self.strength: Optional[int] = None
-        self.wave: Optional[list[int]] = [0, 0, 0, 0]
-        self.waveStrenth: Optional[list[int]] = [0, 0, 0, 0]
+        self.wave: array = array("B", (0, 0, 0, 0))
+        self.waveStrenth: array = array("B", (0, 0, 0, 0))
         self.coefficientStrenth: Optional[int] = None
         self.coefficientFrequency: Optional[int] = None
         self.limit: Optional[int] = None
 
 
+class ChannelA(Channel):
+    __slots__ = ()
+    name = "A"
+
+
+class ChannelB(Channel):
+    __slots__ = ()
+    name = "B"
+
+
+class CoyoteState(NamedTuple):
+    strengthA: Optional[int]
+    strengthB: Optional[int]
+    waveA: Tuple[int, ...]
+    waveStrenthA: Tuple[int, ...]
+    waveB: Tuple[int, ...]
+    waveStrenthB: Tuple[int, ...]
+    limitA: Optional[int]
+    limitB: Optional[int]
+    battery: Optional[int]
+
+
 class Coyote(object):
+    __slots__ = ("ChannelA", "ChannelB", "Battery")
+
     def __init__(self):
         self.ChannelA: Optional[ChannelA] = ChannelA()
         self.ChannelB: Optional[ChannelB] = ChannelB()
+        self.Battery: Optional[int] = None
+
+    def snapshot(self) -> CoyoteState:
+        a, b = self.ChannelA, self.ChannelB
+        return CoyoteState(
+            a.strength,
+            b.strength,
+            tuple(a.wave),
+            tuple(a.waveStrenth),
+            tuple(b.wave),
+            tuple(b.waveStrenth),
+            a.limit,
+            b.limit,
+            self.Battery,
+        )
 
 
 Wave_set = {
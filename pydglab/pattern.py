@@ -0,0 +1,208 @@
+"""
+Lazy, composable wave patterns.
+
+A Pattern yields one frame per tick, either (X, Y, Z) wave tuples or
+(frequency, intensity) v3 sub-frames, and can be assigned anywhere a wave
+set is accepted. Combinators build new patterns without materializing
+anything, so long or infinite compositions cost constant memory:
+
+    p = repeat(sequence(pattern(warmup), crossfade(a, b, 10)), 5)
+    await dglab_instance.set_wave_set(p, model_v2.ChannelA)
+
+A finite pattern remembers its frames the first time it is played through,
+if there are no more than MEMO_LIMIT of them, so sub-patterns that are
+played repeatedly are only computed once.
+"""
+
+from itertools import chain, cycle, islice
+from collections import deque
+from typing import Callable, Iterable, Iterator, Optional
+
+from pydglab.waveform import WAVE_Z_MAX, WaveSet, WaveStats
+
+MEMO_LIMIT = 4096
+
+# Used for budgets when the content of a pattern is unknown (infinite or too long).
+UNKNOWN_STATS = WaveStats(1, 1.0, 1.0, 1.0, 0.0, 0.0, 1.0)
+
+
+def _intensity_max(frame: tuple, z_max: int) -> int:
+    # Sub-frames carry 0-100, wave tuples Z up to what the device plays, see WAVE_Z_MAX_V3.
+    return 100 if len(frame) == 2 else z_max
+
+
+class Pattern(object):
+    __slots__ = ("_factory", "_compiled", "_unbounded")
+
+    def __init__(self, factory: Callable[[], Iterator[tuple]]) -> None:
+        self._factory = factory
+        self._compiled: Optional[WaveSet] = None
+        self._unbounded = False
+        return None
+
+    def __iter__(self) -> Iterator[tuple]:
+        if self._compiled is not None:
+            return iter(self._compiled)
+        if self._unbounded:
+            return self._factory()
+        return self._memoizing()
+
+    def _memoizing(self) -> Iterator[tuple]:
+        recorded = []
+        for frame in self._factory():
+            if recorded is not None:
+                recorded.append(frame)
+                if len(recorded) > MEMO_LIMIT:
+                    recorded = None
+                    self._unbounded = True
+            yield frame
+        if recorded is not None:
+            self._compiled = WaveSet(recorded)
+
+    def compile(self) -> Optional[WaveSet]:
+        """
+        Materialize the pattern, None if it is infinite or longer than MEMO_LIMIT.
+        """
+        if self._compiled is None and not self._unbounded:
+            for _ in islice(self._memoizing(), MEMO_LIMIT + 1):
+                pass
+        return self._compiled
+
+    @property
+    def stats(self) -> WaveStats:
+        compiled = self.compile()
+        return UNKNOWN_STATS if compiled is None else compiled.stats
+
+
+def pattern(frames: Iterable[tuple]) -> Pattern:
+    """
+    Wrap a list of frames, or a function returning an iterator of frames.
+    """
+    if isinstance(frames, Pattern):
+        return frames
+    if callable(frames):
+        return Pattern(frames)
+    frames = WaveSet(frames)
+    return Pattern(lambda: iter(frames))
+
+
+def sequence(*patterns) -> Pattern:
+    """
+    Play the patterns one after another.
+    """
+    patterns = [pattern(p) for p in patterns]
+    return Pattern(lambda: chain.from_iterable(patterns))
+
+
+def concatenate(patterns: Iterable) -> Pattern:
+    """
+    Like sequence(), but `patterns` may itself be lazy, e.g. a generator function.
+    """
+    if callable(patterns):
+        return Pattern(lambda: chain.from_iterable(map(pattern, patterns())))
+    patterns = list(patterns)
+    return sequence(*patterns)
+
+
+def repeat(p, n: Optional[int] = None) -> Pattern:
+    """
+    Play `p` `n` times, forever when `n` is None.
+    """
+    p = pattern(p)
+    if n is None:
+        return Pattern(lambda: chain.from_iterable(cycle((p,))))
+    return Pattern(lambda: chain.from_iterable(p for _ in range(n)))
+
+
+def _scale_frame(frame: tuple, factor: float, z_max: int) -> tuple:
+    top = _intensity_max(frame, z_max)
+    return frame[:-1] + (min(int(frame[-1] * factor), top),)
+
+
+def scale(p, factor: float, z_max: int = WAVE_Z_MAX) -> Pattern:
+    """
+    Scale the intensity of every frame, wave tuple Z is capped at `z_max`.
+    """
+    p = pattern(p)
+    return Pattern(lambda: (_scale_frame(frame, factor, z_max) for frame in p))
+
+
+def clamp(p, peak: float, z_max: int = WAVE_Z_MAX) -> Pattern:
+    """
+    Limit the intensity of every frame to `peak`, normalized to 0-1, with `z_max` as full wave tuple Z.
+    """
+    p = pattern(p)
+
+    def clamped():
+        for frame in p:
+            top = int(_intensity_max(frame, z_max) * peak)
+            yield frame[:-1] + (min(frame[-1], top),)
+
+    result = Pattern(clamped)
+    # Same length as `p`, so there is nothing to compile when `p` is already known unbounded.
+    result._unbounded = p._unbounded
+    return result
+
+
+def blend(a: tuple, b: tuple, weight: float) -> tuple:
+    return tuple(int(round(x + (y - x) * weight)) for x, y in zip(a, b))
+
+
+def crossfade(a, b, ticks: int) -> Pattern:
+    """
+    Play `a`, then `b`, blending the last `ticks` frames of `a` into the first `ticks` of `b`.
+    """
+    a, b = pattern(a), pattern(b)
+
+    def faded():
+        # Only `ticks` frames of lookahead are kept.
+        tail = deque()
+        for frame in a:
+            tail.append(frame)
+            if len(tail) > ticks:
+                yield tail.popleft()
+        frames = iter(b)
+        count = len(tail)
+        for index, (x, y) in enumerate(zip(tail, frames)):
+            yield blend(x, y, (index + 1) / (count + 1))
+        yield from frames
+
+    return Pattern(faded)
+
+
+def mirror(p) -> Pattern:
+    """
+    Play `p` forward, then backward. `p` has to be finite.
+    """
+    p = pattern(p)
+
+    def mirrored():
+        frames = p.compile()
+        if frames is None:
+            frames = tuple(p)
+        yield from frames
+        yield from reversed(frames)
+
+    return Pattern(mirrored)
+
+
+def offset(p, ticks: int, fill: tuple = None) -> Pattern:
+    """
+    Delay `p` by `ticks` frames, used to shift one channel against the other.
+    `fill` defaults to a silent frame of the same kind as `p`.
+    """
+    p = pattern(p)
+
+    def delayed():
+        frames = iter(p)
+        first = next(frames, None)
+        if first is None:
+            return
+        silent = fill
+        if silent is None:
+            silent = (10, 0) if len(first) == 2 else (0, 0, 0)
+        yield from (silent for _ in range(ticks))
+        yield first
+        yield from frames
+
+    return Pattern(delayed)
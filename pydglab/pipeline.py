@@ -0,0 +1,97 @@
+import logging, asyncio, time
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, Awaitable, Callable, Hashable, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+class WriteTiming(NamedTuple):
+    key: str
+    queued: float
+    started: float
+    finished: float
+
+    @property
+    def wait(self) -> float:
+        return self.started - self.queued
+
+    @property
+    def duration(self) -> float:
+        return self.finished - self.started
+
+
+class WritePipeline(object):
+    """
+    Issue BLE writes concurrently within a bounded in-flight window.
+
+    Writes submitted with the same key (usually the characteristic they target)
+    are serialized in submission order, writes with different keys may overlap.
+    Timing of every completed write is kept in `timings`.
+    An optional `limiter` (e.g. the AdapterGroup of the device) is entered
+    around every write as well, to cap writes shared with other pipelines.
+    """
+
+    def __init__(self, max_inflight: int = 3, history: int = 256, limiter=None) -> None:
+        self.max_inflight = max_inflight
+        self.limiter = limiter
+        self._window = asyncio.Semaphore(max_inflight)
+        self._locks: dict[Hashable, asyncio.Lock] = {}
+        self.timings: deque[WriteTiming] = deque(maxlen=history)
+        return None
+
+    async def submit(
+        self, key: Hashable, write: Callable[..., Awaitable[Any]], *args
+    ) -> Any:
+        """
+        提交一次写入，同一key的写入保持先后顺序。
+        Submit a write, writes sharing a key keep their order.
+
+        Args:
+            key (Hashable): 写入目标，通常为特征
+            write (Callable[..., Awaitable[Any]]): 写入协程函数
+            *args: 传递给写入函数的参数
+
+        Returns:
+            Any: 写入函数的返回值
+        """
+        queued = time.perf_counter()
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        # The per-key lock is FIFO, so it is taken first to keep ordering,
+        # the window only bounds how many keys are on air at once.
+        async with lock:
+            async with self._window, self.limiter or nullcontext():
+                started = time.perf_counter()
+                try:
+                    return await write(*args)
+                finally:
+                    self.timings.append(
+                        WriteTiming(str(key), queued, started, time.perf_counter())
+                    )
+
+    async def gather(self, *writes: tuple) -> tuple:
+        """
+        并发提交多次写入。
+        Submit several writes concurrently.
+
+        Args:
+            *writes (tuple): (key, write, *args)
+
+        Returns:
+            tuple: 各写入的返回值
+        """
+        return tuple(
+            await asyncio.gather(*(self.submit(*write) for write in writes))
+        )
+
+    def last_spread(self, count: int) -> float:
+        """
+        最近count次写入从首次开始到最后完成的时间跨度，用于确认多通道是否落在同一连接事件内。
+        Time from the first start to the last finish of the last `count` writes.
+        """
+        recent = list(self.timings)[-count:]
+        if not recent:
+            return 0.0
+        return max(t.finished for t in recent) - min(t.started for t in recent)
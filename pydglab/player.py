@@ -0,0 +1,161 @@
+"""
+Wave set playback with explicit switchover.
+
+A WavePlayer plays whatever wave set a channel holds, item by item and
+pass after pass, and decides when a newly assigned set takes over:
+
+- "immediate": on the next tick, the old set is cut off.
+- "cycle_end": when the old set finishes its pass (the original behaviour).
+- "crossfade": on the next tick, blending from the old set into the new
+  one over `ticks` ticks.
+
+Infinite patterns never finish a pass, so only "immediate" and
+"crossfade" switch away from them.
+"""
+
+import logging
+from collections import deque
+from itertools import chain, repeat
+from typing import Callable, Iterable, Iterator, Optional
+
+from pydglab.clock import Clock, system
+from pydglab.pattern import blend
+from pydglab.scheduler import percentile
+
+logger = logging.getLogger(__name__)
+
+SWITCHOVER_MODES = ("immediate", "cycle_end", "crossfade")
+
+_END = object()
+
+
+def _items_per_tick(item: tuple) -> int:
+    # v3 sub-frames go four to a tick, wave tuples one.
+    return 4 if len(item) == 2 else 1
+
+
+class WavePlayer(object):
+    def __init__(
+        self,
+        source: Callable[[], Iterable[tuple]],
+        mode: str = "cycle_end",
+        ticks: int = 10,
+        clock: Clock = None,
+        history: int = 256,
+    ) -> None:
+        """
+        Args:
+            source (Callable[[], Iterable[tuple]]): 返回通道当前波形组的函数
+            mode (str): 默认切换方式，immediate，cycle_end或crossfade
+            ticks (int): crossfade默认持续的tick数
+            clock (Clock): 时间源
+            history (int): 保留的切换延迟数量
+        """
+        if mode not in SWITCHOVER_MODES:
+            raise ValueError(f"Unknown switchover mode {mode}, use one of {SWITCHOVER_MODES}")
+        self.source = source
+        self.mode = mode
+        self.ticks = ticks
+        self.clock = clock or system
+        self.switches: int = 0
+        # Seconds from a switch being requested until its first item is written.
+        self.latency: deque[float] = deque(maxlen=history)
+        self._current: Optional[Iterable[tuple]] = None
+        self._frames: Iterator[tuple] = iter(())
+        self._request: Optional[tuple] = None
+        self._landing: Optional[float] = None
+        self._landed: Optional[float] = None
+        return None
+
+    def request(self, mode: str = None, ticks: int = None) -> None:
+        """
+        Set how the next assigned wave set takes over, call it right before assigning.
+        """
+        mode = mode or self.mode
+        if mode not in SWITCHOVER_MODES:
+            raise ValueError(f"Unknown switchover mode {mode}, use one of {SWITCHOVER_MODES}")
+        self._request = (mode, self.ticks if ticks is None else ticks, self.clock.monotonic())
+        return None
+
+    def __iter__(self) -> "WavePlayer":
+        return self
+
+    def __next__(self) -> Optional[tuple]:
+        """
+        The next item, None while there is nothing to play.
+        """
+        source = self.source()
+        if source is not self._current:
+            if self._request is None:
+                self._request = (self.mode, self.ticks, self.clock.monotonic())
+            if self._request[0] != "cycle_end" or self._current is None:
+                self._switch(source)
+        item = next(self._frames, _END)
+        if item is _END:
+            if source is not self._current:
+                self._switch(source)
+            else:
+                self._frames = iter(self._current)
+            item = next(self._frames, None)
+        if self._landing is not None and item is not None:
+            self._landed = self._landing
+            self._landing = None
+        return item
+
+    def written(self) -> None:
+        """
+        Call after the items pulled for a tick were written, times a switch that just landed.
+        """
+        if self._landed is not None:
+            self.latency.append(self.clock.monotonic() - self._landed)
+            self._landed = None
+        return None
+
+    def _switch(self, source: Iterable[tuple]) -> None:
+        mode, ticks, requested = self._request
+        self._request = None
+        old, rest = self._current, self._frames
+        self._current = source
+        self._frames = iter(source)
+        self.switches += 1
+        self._landing = requested
+        if mode == "crossfade" and old and ticks > 0:
+            # The old set keeps playing from where it was, under the fade.
+            self._frames = self._crossfade(
+                chain(rest, chain.from_iterable(repeat(old))), self._frames, ticks
+            )
+        logger.debug(f"Switched wave set ({mode})")
+
+    @staticmethod
+    def _crossfade(old: Iterator[tuple], new: Iterator[tuple], ticks: int) -> Iterator[tuple]:
+        first = next(new, None)
+        if first is None:
+            return
+        new = chain((first,), new)
+        count = ticks * _items_per_tick(first)
+        for index in range(count):
+            b = next(new, None)
+            if b is None:
+                return
+            a = next(old, None)
+            if a is None or len(a) != len(b):
+                # Nothing to fade from, e.g. sub-frames into wave tuples.
+                yield b
+                break
+            yield blend(a, b, (index + 1) / (count + 1))
+        yield from new
+
+    def stats(self) -> dict:
+        """
+        获取切换统计。
+        Get switchover statistics.
+
+        Returns:
+            dict: switches, latency_p50, latency_p99, latency_max (秒)
+        """
+        return {
+            "switches": self.switches,
+            "latency_p50": percentile(self.latency, 50),
+            "latency_p99": percentile(self.latency, 99),
+            "latency_max": max(self.latency, default=0.0),
+        }
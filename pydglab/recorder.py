@@ -0,0 +1,200 @@
+"""
+Per-tick session recording into NumPy-compatible columns.
+
+Every column is its own .npy file in the session directory, rows are
+buffered and appended in chunks of `chunk_size`, and the header is
+rewritten after each chunk, so the files stay loadable even if the
+session never closes cleanly. close() packs them into `<path>.npz`:
+
+    data = numpy.load("session.npz")
+    data["timestamp"], data["strength_a"], data["intensity_a"]
+
+NumPy itself is not needed to record.
+"""
+
+import logging, ast, os, sys, zipfile
+from array import array
+
+logger = logging.getLogger(__name__)
+
+# Fixed header size, so the shape can be rewritten in place.
+HEADER_SIZE = 128
+MAGIC = b"\x93NUMPY\x01\x00"
+
+_ENDIAN = "<" if sys.byteorder == "little" else ">"
+_DESCR = {"B": "|u1", "H": _ENDIAN + "u2", "d": _ENDIAN + "f8"}
+# Values outside these are saturated, see SessionRecorder.append().
+_RANGE = {"B": (0, 0xFF), "H": (0, 0xFFFF)}
+
+# name: (array typecode, values per row)
+COLUMNS_V2 = {
+    "timestamp": ("d", 1),
+    "ack": ("B", 1),
+    "strength_a": ("B", 1),
+    "strength_b": ("B", 1),
+    "reported_a": ("B", 1),
+    "reported_b": ("B", 1),
+    # X, Y, Z
+    "wave_a": ("H", 3),
+    "wave_b": ("H", 3),
+}
+COLUMNS_V3 = {
+    "timestamp": ("d", 1),
+    "ack": ("B", 1),
+    "strength_a": ("B", 1),
+    "strength_b": ("B", 1),
+    "reported_a": ("B", 1),
+    "reported_b": ("B", 1),
+    # One value per 25ms sub-frame.
+    "frequency_a": ("B", 4),
+    "intensity_a": ("B", 4),
+    "frequency_b": ("B", 4),
+    "intensity_b": ("B", 4),
+}
+
+ACK_FAILED = 0
+ACK_WRITTEN = 1
+
+
+def npy_header(descr: str, shape: tuple) -> bytes:
+    """
+    A version 1.0 .npy header, padded to HEADER_SIZE.
+    """
+    header = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': {shape!r}, }}"
+    header = header.ljust(HEADER_SIZE - len(MAGIC) - 2 - 1) + "\n"
+    return MAGIC + len(header).to_bytes(2, "little") + header.encode("latin1")
+
+
+class _Column(object):
+    __slots__ = ("name", "typecode", "width", "rows", "buffer", "file")
+
+    def __init__(self, name: str, typecode: str, width: int, path: str) -> None:
+        self.name = name
+        self.typecode = typecode
+        self.width = width
+        self.rows: int = 0
+        self.buffer = array(typecode)
+        self.file = open(path, "wb+")
+        self._write_header()
+
+    def convert(self, value) -> tuple[tuple, bool]:
+        """
+        One row of this column saturated to the typecode, and whether anything was cut off.
+        """
+        values = (value,) if self.width == 1 else tuple(value)
+        if len(values) != self.width:
+            raise ValueError(f"Column {self.name} takes {self.width} values, got {len(values)}")
+        if self.typecode not in _RANGE:
+            return tuple(float(v) for v in values), False
+        low, high = _RANGE[self.typecode]
+        values = tuple(int(v) for v in values)
+        saturated = tuple(min(max(v, low), high) for v in values)
+        return saturated, saturated != values
+
+    def _write_header(self) -> None:
+        shape = (self.rows,) if self.width == 1 else (self.rows, self.width)
+        self.file.seek(0)
+        self.file.write(npy_header(_DESCR[self.typecode], shape))
+        self.file.seek(0, os.SEEK_END)
+
+    def flush(self) -> None:
+        if not self.buffer:
+            return None
+        self.file.write(self.buffer.tobytes())
+        self.rows += len(self.buffer) // self.width
+        self.buffer = array(self.typecode)
+        self._write_header()
+        self.file.flush()
+
+
+class SessionRecorder(object):
+    def __init__(self, path: str, columns: dict, chunk_size: int = 4096) -> None:
+        """
+        Args:
+            path (str): 会话目录，每列一个.npy文件
+            columns (dict): {列名: (array类型码, 每行数值个数)}，例如COLUMNS_V3
+            chunk_size (int): 每次写入磁盘的行数
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self.rows: int = 0
+        os.makedirs(path, exist_ok=True)
+        self._columns = [
+            _Column(name, typecode, width, os.path.join(path, f"{name}.npy"))
+            for name, (typecode, width) in columns.items()
+        ]
+        self._pending: int = 0
+        # Rows with a value outside its column's range, stored saturated.
+        self.saturated: int = 0
+        return None
+
+    @property
+    def columns(self) -> list[str]:
+        return [column.name for column in self._columns]
+
+    def append(self, *values) -> None:
+        """
+        追加一行，按列顺序传入，多值列传入可迭代对象。
+        Append one row, values in column order, iterables for multi-value columns.
+        Out of range values are saturated, a malformed row raises and leaves every
+        column as it was, so the columns never go out of step.
+        """
+        if len(values) != len(self._columns):
+            raise ValueError(f"Expected {len(self._columns)} values per row, got {len(values)}")
+        row = [column.convert(value) for column, value in zip(self._columns, values)]
+        if any(saturated for _, saturated in row):
+            self.saturated += 1
+        for column, (converted, _) in zip(self._columns, row):
+            column.buffer.extend(converted)
+        self.rows += 1
+        self._pending += 1
+        if self._pending >= self.chunk_size:
+            self.flush()
+        return None
+
+    def flush(self) -> None:
+        for column in self._columns:
+            column.flush()
+        self._pending = 0
+        return None
+
+    def close(self, pack: bool = True) -> str:
+        """
+        写入剩余数据，并打包为.npz。
+        Write what is left, then pack the columns into `<path>.npz`.
+
+        Args:
+            pack (bool): 是否打包为.npz并删除会话目录
+
+        Returns:
+            str: .npz路径，或pack为False时的会话目录
+        """
+        self.flush()
+        for column in self._columns:
+            column.file.close()
+        if not pack:
+            return self.path
+        target = f"{self.path.rstrip(os.sep)}.npz"
+        with zipfile.ZipFile(target, "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for column in self._columns:
+                archive.write(os.path.join(self.path, f"{column.name}.npy"), f"{column.name}.npy")
+        for column in self._columns:
+            os.remove(os.path.join(self.path, f"{column.name}.npy"))
+        if not os.listdir(self.path):
+            os.rmdir(self.path)
+        logger.debug(f"Recorded {self.rows} ticks to {target}")
+        return target
+
+
+def read_column(path: str) -> tuple[tuple, array]:
+    """
+    Read one recorded .npy column without NumPy, returns (shape, values).
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    length = int.from_bytes(data[8:10], "little")
+    header = ast.literal_eval(data[10 : 10 + length].decode("latin1"))
+    typecode = {descr: code for code, descr in _DESCR.items()}[header["descr"]]
+    values = array(typecode)
+    values.frombytes(data[10 + length :])
+    return header["shape"], values
@@ -0,0 +1,256 @@
+"""
+Devices on a dedicated event loop thread, isolated from the application's loop.
+
+    driver = rt.DriverThread().start()
+    device = await driver.connect(pydglab.dglab_v3, address)
+    await device.set_strength_sync(10, 10)  # runs on the driver thread
+    print(await driver.jitter_async())
+
+Ticks and BLE I/O run on the driver loop (uvloop when installed), so slow
+callbacks on the application loop no longer show up as output jitter.
+Coroutine methods of the returned proxy are handed over to the driver
+thread and awaited from the calling loop, events are delivered to the
+loop that subscribed.
+"""
+
+import logging, asyncio, threading, concurrent.futures, functools, inspect
+from typing import Any, Awaitable, Callable
+
+from pydglab.scheduler import percentile
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+logger = logging.getLogger(__name__)
+
+
+class DriverThread(object):
+    def __init__(self, name: str = "pydglab-driver", use_uvloop: bool = None) -> None:
+        """
+        Args:
+            name (str): 线程名称
+            use_uvloop (bool): 是否使用uvloop，默认在已安装时使用
+        """
+        if use_uvloop and uvloop is None:
+            raise Exception("uvloop is not installed, `pip install uvloop`")
+        self.name = name
+        self.use_uvloop = uvloop is not None if use_uvloop is None else use_uvloop
+        self.loop: asyncio.AbstractEventLoop = None
+        self.devices: list = []
+        self._thread: threading.Thread = None
+        return None
+
+    def start(self) -> "DriverThread":
+        """
+        启动驱动线程。
+        Start the driver thread and its event loop.
+        """
+        self.loop = uvloop.new_event_loop() if self.use_uvloop else asyncio.new_event_loop()
+        ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(ready,), name=self.name, daemon=True
+        )
+        self._thread.start()
+        ready.wait()
+        logger.debug(f"Driver thread {self.name} started, uvloop: {self.use_uvloop}")
+        return self
+
+    def _run(self, ready: threading.Event) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(ready.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+    def submit(self, coroutine: Awaitable) -> concurrent.futures.Future:
+        """
+        Schedule a coroutine on the driver thread, from any thread.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    async def run(self, coroutine: Awaitable) -> Any:
+        """
+        在驱动线程上运行协程并等待结果。
+        Run a coroutine on the driver thread and await its result from the calling loop.
+        """
+        return await asyncio.wrap_future(self.submit(coroutine))
+
+    def call(self, function: Callable, *args) -> Any:
+        """
+        Run a plain function on the driver thread, blocking until it returns.
+        Blocks the calling loop, use call_async() from a coroutine.
+        """
+        if threading.current_thread() is self._thread:
+            # Waiting for the loop we are running on would never return.
+            return function(*args)
+        return self._schedule(function, *args).result()
+
+    async def call_async(self, function: Callable, *args) -> Any:
+        """
+        Run a plain function on the driver thread, awaited from the calling loop.
+        """
+        if threading.current_thread() is self._thread:
+            return function(*args)
+        return await asyncio.wrap_future(self._schedule(function, *args))
+
+    def _schedule(self, function: Callable, *args) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+
+        def invoke():
+            try:
+                future.set_result(function(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        self.loop.call_soon_threadsafe(invoke)
+        return future
+
+    async def connect(self, driver: type, *args, **kwargs) -> "DeviceProxy":
+        """
+        在驱动线程上创建并连接设备。
+        Create and connect a device on the driver thread.
+
+        Args:
+            driver (type): dglab或dglab_v3
+            *args, **kwargs: 传给driver的参数
+
+        Returns:
+            DeviceProxy: 设备代理，协程方法在驱动线程上执行
+        """
+
+        async def create():
+            return await driver(*args, **kwargs).create()
+
+        device = await self.run(create())
+        self.devices.append(device)
+        return DeviceProxy(self, device)
+
+    def jitter(self) -> dict:
+        """
+        获取驱动线程上所有设备的tick延迟统计。
+        Get tick lateness over every device on the driver thread.
+
+        Returns:
+            dict: devices, ticks, skipped, lateness_p50, lateness_p99, lateness_max (秒)
+        """
+        return self.call(self._jitter)
+
+    async def jitter_async(self) -> dict:
+        """
+        同jitter()，在协程中等待而不阻塞调用方的事件循环。
+        Like jitter(), awaited without blocking the calling loop.
+        """
+        return await self.call_async(self._jitter)
+
+    def _jitter(self) -> dict:
+        lateness = [value for device in self.devices for value in device.scheduler.lateness]
+        return {
+            "devices": len(self.devices),
+            "ticks": sum(device.scheduler.ticks for device in self.devices),
+            "skipped": sum(device.scheduler.skipped for device in self.devices),
+            "lateness_p50": percentile(lateness, 50),
+            "lateness_p99": percentile(lateness, 99),
+            "lateness_max": max(lateness, default=0.0),
+        }
+
+    async def close(self) -> None:
+        """
+        断开所有设备并停止驱动线程。
+        Close every device, then stop the driver thread.
+        """
+        devices, self.devices = self.devices, []
+
+        async def close_all():
+            await asyncio.gather(*(device.close() for device in devices))
+
+        try:
+            await self.run(close_all())
+        finally:
+            self.stop()
+        return None
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return None
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self._thread = None
+        return None
+
+
+class DeviceProxy(object):
+    """
+    A device living on a DriverThread.
+
+    Coroutine methods are handed over to the driver thread and awaited,
+    plain methods (start_recording(), open_control_block(), get_state(), ...)
+    run on the driver thread between ticks, blocking briefly until they return.
+    Other attributes are read from the device directly. Setters called inside
+    `batch()` are staged on the calling side and applied in one handoff.
+    """
+
+    def __init__(self, thread: DriverThread, device) -> None:
+        self._thread = thread
+        self._device = device
+        self._batch: RemoteBatch = None
+        return None
+
+    @property
+    def device(self):
+        return self._device
+
+    def __getattr__(self, name: str):
+        value = getattr(self._device, name)
+        if inspect.ismethod(value) and not inspect.iscoroutinefunction(value):
+            # The tick loop uses the recorder, control block, etc. without locks,
+            # so they are only ever touched from the driver thread.
+            @functools.wraps(value)
+            def call(*args, **kwargs):
+                return self._thread.call(functools.partial(value, *args, **kwargs))
+
+            return call
+        if not inspect.iscoroutinefunction(value):
+            return value
+
+        @functools.wraps(value)
+        async def handoff(*args, **kwargs):
+            if self._batch is not None and getattr(value, "batchable", False):
+                self._batch.calls.append((name, args, kwargs))
+                return None
+            return await self._thread.run(value(*args, **kwargs))
+
+        return handoff
+
+    def batch(self) -> "RemoteBatch":
+        return RemoteBatch(self)
+
+
+class RemoteBatch(object):
+    def __init__(self, proxy: DeviceProxy) -> None:
+        self.proxy = proxy
+        self.calls: list[tuple[str, tuple, dict]] = []
+        return None
+
+    async def __aenter__(self) -> "RemoteBatch":
+        if self.proxy._batch is not None:
+            raise Exception("A batch is already open on this device")
+        self.proxy._batch = self
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        self.proxy._batch = None
+        if exc_type is not None or not self.calls:
+            return False
+        device, calls = self.proxy.device, self.calls
+
+        async def commit():
+            async with device.batch():
+                for name, args, kwargs in calls:
+                    await getattr(device, name)(*args, **kwargs)
+
+        await self.proxy._thread.run(commit())
+        return False
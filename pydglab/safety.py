@@ -0,0 +1,214 @@
+import logging, asyncio, weakref
+from typing import Awaitable, Optional
+
+from pydglab.waveform import WAVE_Z_MAX, WaveSet, WaveStats, as_wave_set
+from pydglab.pattern import MEMO_LIMIT, clamp
+from pydglab.clock import Clock, system
+
+logger = logging.getLogger(__name__)
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class SafetyBudget(object):
+    """
+    Per-session limits, checked against the statistics cached on a WaveSet.
+
+    Wave sets are checked once when loaded: one exceeding `max_peak`,
+    `max_mean` or `max_duty` is rejected with BudgetExceeded, or scaled
+    down to fit when `mode` is "scale". The session energy budget is
+    charged once per tick, in constant time; once it is spent the output
+    is muted until `reset()`.
+
+    Patterns too long to compile are clamped frame by frame to `max_peak`
+    and `max_mean` instead, and rejected when `max_duty` is below 1.
+
+    Intensities and duty are normalized to 0-1, energy is counted in
+    full-scale ticks (one tick at peak intensity, 100% duty, strength 200).
+    """
+
+    def __init__(
+        self,
+        max_peak: float = 1.0,
+        max_mean: float = 1.0,
+        max_duty: float = 1.0,
+        max_energy: Optional[float] = None,
+        mode: str = "reject",
+    ) -> None:
+        if mode not in ("reject", "scale"):
+            raise ValueError(f"Unknown budget mode {mode}, use reject or scale")
+        self.max_peak = max_peak
+        self.max_mean = max_mean
+        self.max_duty = max_duty
+        self.max_energy = max_energy
+        self.mode = mode
+        self.energy: float = 0.0
+        self.exhausted: bool = False
+        return None
+
+    def admit(self, wave_set, z_max: int = WAVE_Z_MAX) -> WaveSet:
+        """
+        检查波形组是否超出预算，超出时拒绝或按比例缩放。
+        Check a wave set against the budget, reject or scale it when it exceeds.
+
+        Args:
+            wave_set (list): 波形组或子帧组
+            z_max (int): 设备上满强度对应的Z值，v3为WAVE_Z_MAX_V3
+
+        Returns:
+            WaveSet: 允许播放的波形组
+
+        Raises:
+            BudgetExceeded: 超出预算且mode为reject
+        """
+        wave_set = as_wave_set(wave_set, z_max)
+        if not isinstance(wave_set, WaveSet):
+            # A lazy pattern, checked as a whole when it is short enough,
+            # clamped frame by frame otherwise.
+            compiled = wave_set.compile()
+            if compiled is None:
+                if self.max_duty < 1.0:
+                    raise BudgetExceeded(
+                        f"Duty cycle of an infinite or longer than {MEMO_LIMIT} frames pattern"
+                        f" cannot be checked against {self.max_duty:.2f}"
+                    )
+                # No frame above the mean limit keeps the mean below it too.
+                return clamp(wave_set, min(self.max_peak, self.max_mean), z_max)
+            wave_set = as_wave_set(compiled, z_max)
+        stats: WaveStats = wave_set.stats
+        if stats.duty > self.max_duty:
+            # Scaling intensity cannot fix the duty cycle.
+            raise BudgetExceeded(f"Duty cycle {stats.duty:.2f} > {self.max_duty:.2f}")
+        factor = 1.0
+        if stats.peak > self.max_peak:
+            factor = min(factor, self.max_peak / stats.peak)
+        if stats.mean > self.max_mean:
+            factor = min(factor, self.max_mean / stats.mean)
+        if factor == 1.0:
+            return wave_set
+        if self.mode == "reject":
+            raise BudgetExceeded(
+                f"Wave set peak {stats.peak:.2f} / mean {stats.mean:.2f} over budget"
+            )
+        logger.warning(f"Wave set over budget, scaled by {factor:.2f}")
+        return wave_set.scaled(factor)
+
+    def charge(self, energy: float) -> bool:
+        """
+        Charge one tick of output, returns False once the session budget is spent.
+        """
+        if self.max_energy is None:
+            return True
+        if not self.exhausted:
+            self.energy += energy
+            if self.energy > self.max_energy:
+                logger.warning("Session energy budget spent, muting output")
+                self.exhausted = True
+        return not self.exhausted
+
+    def reset(self) -> None:
+        """
+        重置会话能量预算。
+        Reset the session energy budget.
+        """
+        self.energy = 0.0
+        self.exhausted = False
+        return None
+
+
+# Every connected device, so one call can stop all of them.
+_devices: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def register(device) -> None:
+    """
+    Don't use this function directly, devices register themselves on create().
+    """
+    _devices.add(device)
+
+
+def unregister(device) -> None:
+    _devices.discard(device)
+
+
+def _stop(device) -> Awaitable[float]:
+    loop = getattr(device, "loop", None)
+    if loop is None or loop is asyncio.get_running_loop():
+        return device.emergency_stop()
+    # A device on a DriverThread has to be stopped on its own loop.
+    return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(device.emergency_stop(), loop))
+
+
+async def emergency_stop(devices=None) -> dict:
+    """
+    紧急停止：立即并行地将所有已连接设备的强度与波形归零，并锁定直到手动解除。
+    Zero strength and waveform on every connected device in parallel, immediately.
+    Each device stays latched until its clear_emergency_stop() is called.
+
+    Args:
+        devices (Iterable): 要停止的设备，默认为全部已连接设备
+
+    Returns:
+        dict: {设备地址: 停止延迟(秒)}
+    """
+    devices = list(_devices if devices is None else devices)
+    latencies = await asyncio.gather(
+        *(_stop(device) for device in devices), return_exceptions=True
+    )
+    for device, latency in zip(devices, latencies):
+        if isinstance(latency, BaseException):
+            logger.error(f"Emergency stop failed on {device.address}: {latency}")
+    return {device.address: latency for device, latency in zip(devices, latencies)}
+
+
+class DeadManTimer(object):
+    """
+    Triggers emergency_stop() when heartbeat() is not called for `timeout` seconds.
+    """
+
+    def __init__(self, timeout: float, devices=None, clock: Clock = None) -> None:
+        self.timeout = timeout
+        self.devices = devices
+        self.clock = clock or system
+        self.triggered: bool = False
+        self._last = self.clock.monotonic()
+        self._task: asyncio.Task = None
+        return None
+
+    def heartbeat(self) -> None:
+        """
+        喂狗。
+        Tell the timer the controlling app is still alive.
+        """
+        self._last = self.clock.monotonic()
+        self.triggered = False
+        return None
+
+    def start(self) -> "DeadManTimer":
+        self._last = self.clock.monotonic()
+        self._task = asyncio.ensure_future(self._watch())
+        return self
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        return None
+
+    async def _watch(self) -> None:
+        while True:
+            remaining = self._last + self.timeout - self.clock.monotonic()
+            if remaining > 0:
+                await self.clock.sleep(remaining)
+                continue
+            if not self.triggered:
+                logger.error(f"No heartbeat for {self.timeout}s, stopping output")
+                self.triggered = True
+                await emergency_stop(self.devices)
+            await self.clock.sleep(self.timeout)
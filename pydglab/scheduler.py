@@ -0,0 +1,185 @@
+import logging, asyncio
+from collections import deque
+from typing import Awaitable, Callable
+
+from pydglab.clock import Clock, system
+
+logger = logging.getLogger(__name__)
+
+OVERLOAD_POLICIES = ("skip", "delay")
+
+
+def percentile(values, q: float) -> float:
+    """
+    Nearest-rank percentile, `q` in [0, 100].
+    """
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * q / 100))]
+
+
+class TickScheduler(object):
+    """
+    Runs `tick` on a fixed period, deadline by deadline.
+
+    When a tick misses its deadline by one period or more, the `overload`
+    policy decides what happens:
+    - "skip": keep the original phase, the missed frames are dropped and
+      `tick` is told how many, so the output stays current.
+    - "delay": restart the period from now, nothing is dropped but the
+      output falls behind (the behaviour before the scheduler existed).
+
+    An optional `push` resends the current output between ticks, see
+    push_now(). It never advances the frames or moves the deadlines.
+    """
+
+    def __init__(
+        self,
+        tick: Callable[[int], Awaitable[None]],
+        period: float = 0.1,
+        overload: str = "skip",
+        history: int = 1024,
+        clock: Clock = None,
+        push: Callable[[], Awaitable[None]] = None,
+    ) -> None:
+        if period <= 0:
+            raise ValueError("Tick period must be positive")
+        if overload not in OVERLOAD_POLICIES:
+            raise ValueError(f"Unknown overload policy {overload}, use one of {OVERLOAD_POLICIES}")
+        self.tick = tick
+        self.push = push
+        self.clock = clock or system
+        self.period = period
+        self.overload = overload
+        # Offset into the period on a grid shared by every scheduler, see set_phase().
+        self.phase: float = 0.0
+        self._realign = False
+        self.ticks: int = 0
+        self.skipped: int = 0
+        # Out-of-band pushes sent for push_now().
+        self.immediate: int = 0
+        self._now = False
+        self._pushed = float("-inf")
+        self._sleeping = False
+        self._task: asyncio.Task = None
+        # How late each tick started against its deadline, in seconds.
+        self.lateness: deque[float] = deque(maxlen=history)
+        return None
+
+    async def run(self) -> None:
+        """
+        Don't use this function directly.
+        """
+        self._task = asyncio.current_task()
+        deadline = self._aligned(self.clock.monotonic())
+        while True:
+            now = self.clock.monotonic()
+            if self._realign:
+                # Move to the nearest grid point, so the phase change costs
+                # at most half a period of jitter once.
+                self._realign = False
+                shift = (self.phase - deadline) % self.period
+                if shift > self.period / 2:
+                    shift -= self.period
+                deadline += shift
+            wake = deadline
+            if self._now:
+                # Pushes are coalesced to at most one per period.
+                wake = min(deadline, self._pushed + self.period)
+            if now < wake:
+                await self._sleep(wake - now)
+                now = self.clock.monotonic()
+            if now < deadline:
+                if self._now and now >= self._pushed + self.period:
+                    # Out of band: resend the current frame, the deadlines stay as they are.
+                    self._now = False
+                    self._pushed = now
+                    self.immediate += 1
+                    await self.push()
+                continue
+            # The tick carries whatever a pending push would have sent.
+            self._now = False
+
+            late = now - deadline
+            missed = int(late / self.period)
+            if missed and self.overload == "skip":
+                deadline += missed * self.period
+                late -= missed * self.period
+                self.skipped += missed
+                logger.debug(f"Tick overran, skipped {missed} frames")
+            elif missed:
+                deadline = now
+                missed = 0
+
+            self.lateness.append(late)
+            self.ticks += 1
+            await self.tick(missed)
+            deadline += self.period
+
+    async def _sleep(self, delay: float) -> None:
+        self._sleeping = True
+        task = asyncio.current_task()
+        try:
+            await self.clock.sleep(delay)
+        except asyncio.CancelledError:
+            # Woken by push_now(), unless someone else cancelled as well.
+            if not self._now or task.uncancel() > 0:
+                raise
+        finally:
+            self._sleeping = False
+
+    @property
+    def task(self) -> asyncio.Task:
+        """
+        The task looping in run(), None before it started.
+        """
+        return self._task
+
+    def push_now(self) -> None:
+        """
+        立即重发当前输出，不推进波形，也不改变tick时间，每个周期最多一次。
+        Resend the current output right away through `push`, without advancing the
+        frames or moving the next tick. At most one push goes out per period, later
+        requests wait for that or are carried by the next tick.
+        """
+        if self.push is None:
+            raise Exception("This scheduler has no push callback")
+        if self._now:
+            return None
+        self._now = True
+        if self._sleeping:
+            self._task.cancel()
+        return None
+
+    def _aligned(self, now: float) -> float:
+        return now + (self.phase - now) % self.period
+
+    def set_phase(self, phase: float) -> None:
+        """
+        设置tick相位，用于同一适配器上的多设备错峰写入。
+        Set the tick phase, used to stagger devices sharing one adapter.
+
+        Args:
+            phase (float): 在周期内的偏移(秒)
+        """
+        self.phase = phase % self.period
+        self._realign = True
+        return None
+
+    def stats(self) -> dict:
+        """
+        获取调度统计。
+        Get scheduling statistics.
+
+        Returns:
+            dict: ticks, skipped, immediate, lateness_p50, lateness_p99, lateness_max (秒)
+        """
+        return {
+            "ticks": self.ticks,
+            "skipped": self.skipped,
+            "immediate": self.immediate,
+            "lateness_p50": percentile(self.lateness, 50),
+            "lateness_p99": percentile(self.lateness, 99),
+            "lateness_max": max(self.lateness, default=0.0),
+        }
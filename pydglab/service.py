@@ -6,15 +6,83 @@ import pydglab.model_v3 as model_v3
 from pydglab.uuid import *
 import pydglab.bthandler_v2 as v2
 import pydglab.bthandler_v3 as v3
+from pydglab.pipeline import WritePipeline
+import pydglab.adapter as adapter_
+from pydglab.telemetry import TelemetryPoller
+from pydglab.scheduler import TickScheduler
+from pydglab.batch import Batch, batchable, apply_, commit_
+from pydglab.safety import SafetyBudget, BudgetExceeded
+import pydglab.safety as safety
+from pydglab.waveform import WaveSetSlot, WAVE_Z_MAX_V3
+from pydglab import trace
+from pydglab.events import EventHub
+from pydglab.clock import Clock, system
+from pydglab.player import WavePlayer
+from pydglab.shm import ControlBlock, ControlState
+from pydglab.recorder import SessionRecorder, COLUMNS_V2, COLUMNS_V3, ACK_FAILED, ACK_WRITTEN
+import pydglab.events as events
 
 logger = logging.getLogger(__name__)
 
 
 class dglab(object):
-    coyote = model_v2.Coyote()
+    channelA_wave_set = WaveSetSlot()
+    channelB_wave_set = WaveSetSlot()
 
-    def __init__(self, address: str = None) -> None:
+    def __init__(
+        self,
+        address: str = None,
+        max_inflight: int = 3,
+        strength_max_age: float = 1.0,
+        tick_period: float = 0.1,
+        overload: str = "skip",
+        safety_budget: SafetyBudget = None,
+        adapter: str = None,
+        client: BleakClient = None,
+        clock: Clock = None,
+        switchover: str = "cycle_end",
+        crossfade_ticks: int = 10,
+    ) -> None:
         self.address = address
+        # Injectable time source, e.g. pydglab.clock.VirtualClock for simulations.
+        self.clock = clock or system
+        # A ready-made client, e.g. pydglab.virtual.VirtualClient, replaces the BleakClient.
+        self.client = client
+        # Devices on one adapter are staggered and share an in-flight write cap.
+        self.adapter = adapter
+        self.adapter_group = adapter_.group(adapter)
+        # Checked when a wave set is loaded, and charged once per tick.
+        self.safety_budget = safety_budget
+        # Device state changes fan out to subscribers, see pydglab.events.
+        self.events = EventHub(parent=events.hub, clock=self.clock)
+        # Latched by emergency_stop(), output stays zero until cleared.
+        self.stopped: bool = False
+        self.stop_latency: float = None
+        self.coyote = model_v2.Coyote()
+        # Decide when a newly assigned wave set takes over, see pydglab.player.
+        self.channelA_player = WavePlayer(
+            lambda: self.channelA_wave_set, switchover, crossfade_ticks, self.clock
+        )
+        self.channelB_player = WavePlayer(
+            lambda: self.channelB_wave_set, switchover, crossfade_ticks, self.clock
+        )
+        self.scheduler = TickScheduler(self._tick, tick_period, overload, clock=self.clock)
+        self._batch: Batch = None
+        self._pending_batches: list[Batch] = []
+        self._deferring = False
+        self._dirty: set[str] = set()
+        # Per-tick state is recorded here while a recording runs.
+        self.recorder: SessionRecorder = None
+        # Out-of-process clients steer the device through this, see pydglab.shm.
+        self.control_block: ControlBlock = None
+        # Cached strength younger than this is served without a BLE read.
+        self.strength_max_age = strength_max_age
+        self.strength_timestamp: float = 0.0
+        self.strength_notify: bool = False
+        # Last strength read from or notified by the device.
+        self.reported_strength: Tuple[int, int] = (0, 0)
+        # Writes to different characteristics share one connection event where possible.
+        self.pipeline = WritePipeline(max_inflight, limiter=self.adapter_group)
         return None
 
     async def create(self) -> "dglab":
@@ -35,11 +103,29 @@ class dglab(object):
 
         # Connect to the device.
         logger.debug(f"Connecting to {self.address}")
-        self.client = BleakClient(self.address, timeout=20.0)
+        # The loop the device lives on, other loops hand calls over to it.
+        self.loop = asyncio.get_running_loop()
+        if self.client is None and self.adapter is None:
+            self.client = BleakClient(
+                self.address,
+                timeout=20.0,
+                disconnected_callback=self._disconnected_callback,
+            )
+        elif self.client is None:
+            self.client = BleakClient(
+                self.address,
+                timeout=20.0,
+                disconnected_callback=self._disconnected_callback,
+                adapter=self.adapter,
+            )
+        elif getattr(self.client, "disconnected_callback", False) is None:
+            # An injected client, e.g. a VirtualClient, reports to this device
+            # unless it was given a callback of its own.
+            self.client.disconnected_callback = self._disconnected_callback
         await self.client.connect()
 
         # Wait for a second to allow service discovery to complete
-        await asyncio.sleep(1)
+        await self.clock.sleep(1)
 
         # Check if the device is valid.
         services = self.client.services
@@ -49,7 +135,7 @@ class dglab(object):
             logger.info("Connected to DGLAB v2.0")
 
             # Update BleakGATTCharacteristic into characteristics list, to optimize performence.
-            self.characteristics = CoyoteV2
+            self.characteristics = CoyoteV2()
             logger.debug(f"Got characteristics: {str(self.characteristics)}")
             for i in self.client.services.characteristics.values():
                 if i.uuid == self.characteristics.characteristicBattery:
@@ -71,20 +157,49 @@ class dglab(object):
         self.channelA_wave_set: list[tuple[int, int, int]] = []
         self.channelB_wave_set: list[tuple[int, int, int]] = []
 
+        # Slow-changing state is polled in the background, between tick writes.
+        self.tick_written = asyncio.Event()
+        self.telemetry = TelemetryPoller(
+            gate=self._tick_slot,
+            clock=self.clock,
+            on_update=lambda name, value: self.events.publish(self.address, name, value),
+        )
+        self.telemetry.add(
+            "battery", self._read_batterylevel, urgent=lambda value: value <= 20
+        )
+
+        # Keep the strength cache fresh from notifications where supported.
+        self.strength_notify = await v2.notify_strength_(
+            self.client, self.characteristics, self._strength_callback
+        )
+        logger.debug(f"Strength notifications: {self.strength_notify}")
+        if not self.strength_notify:
+            self.telemetry.add("strength", lambda: self.get_strength(0))
+
         # Initialize self.coyote
         await self.get_batterylevel()
-        await self.get_strength()
+        self.coyote.ChannelA.strength, self.coyote.ChannelB.strength = await self.get_strength(0)
 
         await self.set_wave_sync(0, 0, 0, 0, 0, 0)
         await self.set_strength(0, 0)
 
         # Start the wave tasks, to keep the device functioning.
+        safety.register(self)
+        self.adapter_group.join(self)
         self.wave_tasks = asyncio.gather(
             self._keep_wave(),
+            self.telemetry.run(),
         )
 
         return self
 
+    def _disconnected_callback(self, client: BleakClient) -> None:
+        """
+        Don't use this function directly.
+        """
+        logger.warning(f"Disconnected from {self.address}")
+        self.events.publish(self.address, "disconnect")
+
     @classmethod
     async def from_address(cls, address: str) -> "dglab":
         """
@@ -110,26 +225,88 @@ class dglab(object):
             int: The battery level as an integer value.
         """
 
+        value = await self._read_batterylevel()
+        self.telemetry.update("battery", value)
+        return value
+
+    async def _read_batterylevel(self) -> int:
+        """
+        Don't use this function directly.
+        """
         value = await v2.get_batterylevel_(self.client, self.characteristics)
         value = value[0]
         logger.debug(f"Received battery level: {value}")
         self.coyote.Battery = int(value)
         return self.coyote.Battery
 
-    async def get_strength(self) -> Tuple[int, int]:
+    async def _tick_slot(self) -> None:
         """
-        读取郊狼当前强度。
-        Retrieves the strength of the device.
+        Don't use this function directly.
+
+        Waits until the current tick has been written, so a read
+        issued afterwards does not delay the next frame.
+        """
+        self.tick_written.clear()
+        try:
+            await asyncio.wait_for(self.tick_written.wait(), 1)
+        except asyncio.TimeoutError:
+            pass
+
+    async def get_strength(self, max_age: float = None) -> Tuple[int, int]:
+        """
+        读取郊狼当前强度，缓存未过期时直接返回缓存。
+        Retrieves the strength of the device, served from cache while it is fresh.
+
+        Args:
+            max_age (float): 缓存最大允许时长(秒)，默认为strength_max_age，0为强制读取
 
         Returns:
-            Tuple[int, int]: 通道A强度，通道B强度
+            Tuple[int, int]: 设备报告的通道A强度，通道B强度
         """
-        value = await v2.get_strength_(self.client, self.characteristics)
-        logger.debug(f"Received strength: A: {value[0]}, B: {value[1]}")
-        self.coyote.ChannelA.strength = int(value[0])
-        self.coyote.ChannelB.strength = int(value[1])
-        return self.coyote.ChannelA.strength, self.coyote.ChannelB.strength
+        if max_age is None:
+            max_age = self.strength_max_age
+        if self.clock.time() - self.strength_timestamp > max_age:
+            value = await v2.get_strength_(self.client, self.characteristics)
+            logger.debug(f"Received strength: A: {value[0]}, B: {value[1]}")
+            self.reported_strength = (int(value[0]), int(value[1]))
+            self.strength_timestamp = self.clock.time()
+        return self.reported_strength
+
+    def _strength_written(self) -> None:
+        """
+        Don't use this function directly.
+
+        Without notifications the cache no longer matches the device, the next get_strength() reads.
+        """
+        if not self.strength_notify:
+            self.strength_timestamp = 0.0
+        return None
+
+    def _strength_callback(self, sender: BleakGATTCharacteristic, data: bytearray):
+        """
+        Don't use this function directly.
+        """
+        with trace.span("notify", "v2", self.address, characteristic="power"):
+            value = v2.decode_strength_(data)
+            logger.debug(f"Notified strength: A: {value[0]}, B: {value[1]}")
+            self.strength_timestamp = self.clock.time()
+            # Only what the device reported, the targets in self.coyote stay as set.
+            value = (int(value[0]), int(value[1]))
+            if value != self.reported_strength:
+                self.reported_strength = value
+                self.events.publish(self.address, "strength", value)
+
+    def get_state(self) -> model_v2.CoyoteState:
+        """
+        获取当前设备状态的紧凑快照，不产生蓝牙通信。
+        Take a compact snapshot of the device state, without touching BLE.
+
+        Returns:
+            CoyoteState: 设备状态
+        """
+        return self.coyote.snapshot()
 
+    @batchable
     async def set_strength(self, strength: int, channel: model_v2.ChannelA | model_v2.ChannelB) -> None:
         """
         设置电压强度。
@@ -148,14 +325,24 @@ class dglab(object):
             self.coyote.ChannelA.strength = strength
         elif channel is model_v2.ChannelB:
             self.coyote.ChannelB.strength = strength
-        r = await v2.set_strength_(self.client, self.coyote, self.characteristics)
-        logger.debug(f"Set strength response: {r}")
+        if self.stopped:
+            logger.warning("Emergency stop latched, strength kept at 0")
+            self._zero()
+        if self._deferring:
+            self._dirty.add("power")
+        else:
+            r = await self.pipeline.submit(
+                "power", v2.set_strength_, self.client, self.coyote, self.characteristics
+            )
+            self._strength_written()
+            logger.debug(f"Set strength response: {r}")
         return (
             self.coyote.ChannelA.strength
             if channel is model_v2.ChannelA
             else self.coyote.ChannelB.strength
         )
 
+    @batchable
     async def set_strength_sync(self, strengthA: int, strengthB: int) -> None:
         """
         同步设置电流强度。
@@ -171,8 +358,17 @@ class dglab(object):
         """
         self.coyote.ChannelA.strength = strengthA
         self.coyote.ChannelB.strength = strengthB
-        r = await v2.set_strength_(self.client, self.coyote, self.characteristics)
-        logger.debug(f"Set strength response: {r}")
+        if self.stopped:
+            logger.warning("Emergency stop latched, strength kept at 0")
+            self._zero()
+        if self._deferring:
+            self._dirty.add("power")
+        else:
+            r = await self.pipeline.submit(
+                "power", v2.set_strength_, self.client, self.coyote, self.characteristics
+            )
+            self._strength_written()
+            logger.debug(f"Set strength response: {r}")
         return self.coyote.ChannelA.strength, self.coyote.ChannelB.strength
 
     """
@@ -183,8 +379,13 @@ class dglab(object):
     self.coyote.ChannelN.waveN.
     """
 
+    @batchable
     async def set_wave_set(
-        self, wave_set: list[tuple[int, int, int]], channel: model_v2.ChannelA | model_v2.ChannelB
+        self,
+        wave_set: list[tuple[int, int, int]],
+        channel: model_v2.ChannelA | model_v2.ChannelB,
+        switchover: str = None,
+        ticks: int = None,
     ) -> None:
         """
         设置波形组，也就是所谓“不断变化的波形”。
@@ -193,20 +394,27 @@ class dglab(object):
         Args:
             wave_set (list[tuple[int, int, int]]): 波形组
             channel (ChannelA | ChannelB): 对手通道
+            switchover (str): 切换方式，immediate，cycle_end或crossfade，默认为构造时指定的方式，批量修改中为immediate
+            ticks (int): crossfade持续的tick数
 
         Returns:
             None: None
         """
         if channel is model_v2.ChannelA:
+            self.channelA_player.request(self._switchover(switchover), ticks)
             self.channelA_wave_set = wave_set
         elif channel is model_v2.ChannelB:
+            self.channelB_player.request(self._switchover(switchover), ticks)
             self.channelB_wave_set = wave_set
         return None
 
+    @batchable
     async def set_wave_set_sync(
         self,
         wave_setA: list[tuple[int, int, int]],
         wave_setB: list[tuple[int, int, int]],
+        switchover: str = None,
+        ticks: int = None,
     ) -> None:
         """
         同步设置波形组。
@@ -215,10 +423,14 @@ class dglab(object):
         Args:
             wave_setA (list[tuple[int, int, int]]): 通道A波形组
             wave_setB (list[tuple[int, int, int]]): 通道B波形组
+            switchover (str): 切换方式，immediate，cycle_end或crossfade
+            ticks (int): crossfade持续的tick数
 
         Returns:
             None: None
         """
+        self.channelA_player.request(self._switchover(switchover), ticks)
+        self.channelB_player.request(self._switchover(switchover), ticks)
         self.channelA_wave_set = wave_setA
         self.channelB_wave_set = wave_setB
         return None
@@ -230,6 +442,7 @@ class dglab(object):
     All the wave changes will be applied to the device by wave_set.
     """
 
+    @batchable
     async def set_wave(
         self, waveX: int, waveY: int, waveZ: int, channel: model_v2.ChannelA | model_v2.ChannelB
     ) -> Tuple[int, int, int]:
@@ -248,11 +461,14 @@ class dglab(object):
             Tuple[int, int, int]: 波形
         """
         if channel is model_v2.ChannelA:
+            self.channelA_player.request(self._switchover())
             self.channelA_wave_set = [(waveX, waveY, waveZ)]
         elif channel is model_v2.ChannelB:
+            self.channelB_player.request(self._switchover())
             self.channelB_wave_set = [(waveX, waveY, waveZ)]
         return waveX, waveY, waveZ
 
+    @batchable
     async def set_wave_sync(
         self,
         waveX_A: int,
@@ -277,13 +493,24 @@ class dglab(object):
         Returns:
             Tuple[Tuple[int, int, int], Tuple[int, int, int]]: A通道波形，B通道波形
         """
+        self.channelA_player.request(self._switchover())
+        self.channelB_player.request(self._switchover())
         self.channelA_wave_set = [(waveX_A, waveY_A, waveZ_A)]
         self.channelB_wave_set = [(waveX_B, waveY_B, waveZ_B)]
-        r = await v2.set_wave_(
-            self.client, self.coyote.ChannelA, self.characteristics
-        ), await v2.set_wave_(self.client, self.coyote.ChannelB, self.characteristics)
+        if not self._deferring:
+            await self._write_waves()
         return (waveX_A, waveY_A, waveZ_A), (waveX_B, waveY_B, waveZ_B)
 
+    def _switchover(self, switchover: str = None) -> str:
+        """
+        Don't use this function directly.
+
+        Sets staged in a batch switch right away, so they play on the tick that commits it.
+        """
+        if switchover is None and self._deferring:
+            return "immediate"
+        return switchover
+
     def _channelA_wave_set_handler(self):
         """
         Do not use this function directly.
@@ -291,12 +518,12 @@ class dglab(object):
         Yep this is how wave set works :)
         PR if you have a better solution.
         """
-        while True:
-            for wave in self.channelA_wave_set:
+        for wave in self.channelA_player:
+            if wave is not None:
                 self.coyote.ChannelA.waveX = wave[0]
                 self.coyote.ChannelA.waveY = wave[1]
                 self.coyote.ChannelA.waveZ = wave[2]
-                yield (None)
+            yield (None)
 
     def _channelB_wave_set_handler(self):
         """
@@ -305,43 +532,316 @@ class dglab(object):
         Yep this is how wave set works :)
         PR if you have a better solution.
         """
-        while True:
-            for wave in self.channelB_wave_set:
+        for wave in self.channelB_player:
+            if wave is not None:
                 self.coyote.ChannelB.waveX = wave[0]
                 self.coyote.ChannelB.waveY = wave[1]
                 self.coyote.ChannelB.waveZ = wave[2]
-                yield (None)
+            yield (None)
+
+    async def _write_waves(self, *writes: tuple) -> tuple:
+        """
+        Don't use this function directly.
+
+        Writes both channels concurrently, each characteristic keeps its own order.
+        Extra (key, write, *args) writes join the same window.
+        """
+        r = await self.pipeline.gather(
+            ("A", v2.set_wave_, self.client, self.coyote.ChannelA, self.characteristics),
+            ("B", v2.set_wave_, self.client, self.coyote.ChannelB, self.characteristics),
+            *writes,
+        )
+        logger.debug(
+            f"Wave writes spread: {self.pipeline.last_spread(len(r)) * 1000:.2f}ms"
+        )
+        return r
+
+    def batch(self) -> Batch:
+        """
+        开启一次批量修改，退出时在同一个tick内一次性生效。
+        Open a batch, staged changes are applied together on one tick on exit.
+
+        Usage:
+            async with dglab_instance.batch():
+                await dglab_instance.set_strength_sync(10, 10)
+                await dglab_instance.set_wave_set_sync(wave_setA, wave_setB)
+
+        Returns:
+            Batch: 批量修改上下文
+        """
+        return Batch(self)
+
+    def get_write_timings(self) -> list:
+        """
+        获取最近的写入耗时记录。
+        Get timing of the recent writes.
+
+        Returns:
+            list[WriteTiming]: (key, queued, started, finished)
+        """
+        return list(self.pipeline.timings)
 
     async def _keep_wave(self) -> None:
         """
         Don't use this function directly.
         """
-        last_time = time.time()
+        self._ChannelA_keeping = self._channelA_wave_set_handler()
+        self._ChannelB_keeping = self._channelB_wave_set_handler()
+
+        try:
+            await self.scheduler.run()
+        except asyncio.exceptions.CancelledError:
+            logger.error("Cancelled error")
+        return None
 
-        ChannelA_keeping = self._channelA_wave_set_handler()
-        ChannelB_keeping = self._channelB_wave_set_handler()
+    async def _tick(self, skipped: int) -> None:
+        """
+        Don't use this function directly.
+        """
+        # Frames whose deadline already passed are dropped, not sent late.
+        for _ in range(skipped):
+            next(self._ChannelA_keeping)
+            next(self._ChannelB_keeping)
+
+        if self.control_block is not None:
+            await self._apply_control()
+        dirty, batches = await apply_(self)
+        # The frame for this tick is pulled right before it is written, so
+        # whatever was applied above already plays on this tick.
+        with trace.span("next_frame", "v2", self.address):
+            next(self._ChannelA_keeping)
+            next(self._ChannelB_keeping)
+        if self.safety_budget is not None and not self.safety_budget.charge(
+            self._tick_energy()
+        ):
+            self.coyote.ChannelA.waveX = 0
+            self.coyote.ChannelB.waveX = 0
+        if self.stopped:
+            self._zero()
+        writes = ()
+        if "power" in dirty:
+            writes = (
+                ("power", v2.set_strength_, self.client, self.coyote, self.characteristics),
+            )
 
-        while True:
+        with trace.span("tick", "v2", self.address):
             try:
-                # logger.debug(f"Time elapsed: {time.time() - last_time}")
-                if time.time() - last_time >= 0.1:
+                r = await self._write_waves(*writes)
+            except Exception as e:
+                commit_(batches, e)
+                self._record(ACK_FAILED)
+                raise
+            commit_(batches)
+            self._record(ACK_WRITTEN)
+            self._mirror_control()
+            if writes:
+                self._strength_written()
+            logger.debug(f"Set wave response: {r}")
+            self.channelA_player.written()
+            self.channelB_player.written()
+            self.tick_written.set()
+        return None
 
-                    # Record time for loop
-                    last_time = time.time()
+    def start_recording(self, path: str, chunk_size: int = 4096) -> SessionRecorder:
+        """
+        开始逐tick记录设备状态，可用numpy直接读取。
+        Record the state of every tick into NumPy-compatible columns, see pydglab.recorder.
 
-                    r = await v2.set_wave_(
-                        self.client, self.coyote.ChannelA, self.characteristics
-                    ), await v2.set_wave_(
-                        self.client, self.coyote.ChannelB, self.characteristics
-                    )
-                    logger.debug(f"Set wave response: {r}")
-                    next(ChannelA_keeping)
-                    next(ChannelB_keeping)
-            except asyncio.exceptions.CancelledError:
-                logger.error("Cancelled error")
-                break
+        Args:
+            path (str): 会话目录，结束时打包为<path>.npz
+            chunk_size (int): 每次写入磁盘的行数
+
+        Returns:
+            SessionRecorder: 记录器
+        """
+        if self.recorder is not None:
+            raise Exception("A recording is already running on this device")
+        self.recorder = SessionRecorder(path, COLUMNS_V2, chunk_size)
+        return self.recorder
+
+    def stop_recording(self, pack: bool = True) -> str:
+        """
+        结束记录。
+        Stop recording.
+
+        Args:
+            pack (bool): 是否打包为.npz
+
+        Returns:
+            str: 记录文件路径
+        """
+        recorder, self.recorder = self.recorder, None
+        return None if recorder is None else recorder.close(pack)
+
+    def _record(self, ack: int) -> None:
+        """
+        Don't use this function directly.
+        """
+        if self.recorder is None:
+            return None
+        a, b = self.coyote.ChannelA, self.coyote.ChannelB
+        try:
+            self.recorder.append(
+                self.clock.time(), ack, a.strength, b.strength, *self.reported_strength,
+                (a.waveX, a.waveY, a.waveZ), (b.waveX, b.waveY, b.waveZ),
+            )
+        except Exception as e:
+            # The row is dropped as a whole, recording never stops the tick loop.
+            logger.error(f"Tick not recorded: {e}")
+        return None
+
+    def open_control_block(self, path: str, wave_sets=()) -> ControlBlock:
+        """
+        开放一个内存映射控制块，供其他进程无系统调用地控制设备。
+        Expose a memory-mapped control block, read once per tick, see pydglab.shm.
+
+        Args:
+            path (str): 控制块文件路径，例如/dev/shm下的文件
+            wave_sets (Sequence): 可通过槽位序号选择的波形组
+
+        Returns:
+            ControlBlock: 控制块
+
+        Raises:
+            BudgetExceeded: 某个波形组超出safety_budget
+        """
+        if self.control_block is not None:
+            raise Exception("A control block is already open on this device")
+        # Checked up front, a slot the budget rejects must not fail inside a tick.
+        wave_sets = [type(self).channelA_wave_set.load(self, wave_set) for wave_set in wave_sets]
+        self.control_block = ControlBlock(path, wave_sets)
+        return self.control_block
+
+    def close_control_block(self) -> None:
+        control_block, self.control_block = self.control_block, None
+        if control_block is not None:
+            control_block.close()
         return None
 
+    async def _apply_control(self) -> None:
+        """
+        Don't use this function directly.
+
+        Applies what a client wrote since the last tick, as part of this tick.
+        """
+        values = self.control_block.poll()
+        if values is None:
+            return None
+        strengthA, strengthB, slotA, slotB = values
+        self._deferring = True
+        try:
+            for index, (channel, slot) in enumerate(
+                ((model_v2.ChannelA, slotA), (model_v2.ChannelB, slotB))
+            ):
+                wave_set = self.control_block.slot(index, slot)
+                if wave_set is None:
+                    continue
+                try:
+                    # Unwrapped, so an open batch does not swallow the change.
+                    await type(self).set_wave_set.__wrapped__(self, wave_set, channel)
+                except BudgetExceeded as e:
+                    logger.error(f"Control block slot {slot} rejected, keeping the current set: {e}")
+                    continue
+                self.control_block.slots[index] = slot
+            await type(self).set_strength_sync.__wrapped__(
+                self, min(strengthA, 200), min(strengthB, 200)
+            )
+        finally:
+            self._deferring = False
+        return None
+
+    def _mirror_control(self) -> None:
+        """
+        Don't use this function directly.
+        """
+        if self.control_block is None:
+            return None
+        a, b = self.coyote.ChannelA, self.coyote.ChannelB
+        self.control_block.mirror(
+            ControlState(
+                self.scheduler.ticks & 0xFFFFFFFF,
+                a.strength,
+                b.strength,
+                *self.reported_strength,
+                *self.control_block.slots,
+                self.coyote.Battery or 0,
+                self.stopped,
+                self.clock.time(),
+            )
+        )
+        return None
+
+    def _tick_energy(self) -> float:
+        """
+        Don't use this function directly.
+
+        Energy of the coming tick, from the statistics cached on the wave sets.
+        """
+        return (
+            self.channelA_wave_set.stats.energy_per_tick
+            * (self.coyote.ChannelA.strength or 0)
+            + self.channelB_wave_set.stats.energy_per_tick
+            * (self.coyote.ChannelB.strength or 0)
+        ) / 200
+
+    async def emergency_stop(self) -> float:
+        """
+        紧急停止：跳过调度与写入队列，立即将强度与波形归零，并保持锁定直到clear_emergency_stop()。
+        Zero strength and waveform immediately, bypassing the scheduler and the write queue.
+        Output stays latched at zero until clear_emergency_stop() is called.
+
+        Returns:
+            float: 停止延迟(秒)，从调用到写入完成
+        """
+        started = time.perf_counter()
+        self.stopped = True
+        self._zero()
+        await v2.write_stop_(self.client, self.characteristics)
+        self.stop_latency = time.perf_counter() - started
+        self.events.publish(self.address, "emergency_stop", self.stop_latency)
+        logger.warning(f"Emergency stop on {self.address} in {self.stop_latency * 1000:.1f}ms")
+        return self.stop_latency
+
+    async def clear_emergency_stop(self) -> None:
+        """
+        解除紧急停止锁定，强度保持为0，需要重新设置。
+        Release the emergency stop latch, strength stays 0 until set again.
+
+        Returns:
+            None: None
+        """
+        self.stopped = False
+        return None
+
+    def _zero(self) -> None:
+        """
+        Don't use this function directly.
+        """
+        self.coyote.ChannelA.strength = 0
+        self.coyote.ChannelB.strength = 0
+        for channel in (self.coyote.ChannelA, self.coyote.ChannelB):
+            channel.waveX, channel.waveY, channel.waveZ = 0, 0, 0
+
+    def get_tick_stats(self) -> dict:
+        """
+        获取tick调度统计，包括跳过的帧数与延迟。
+        Get tick statistics, including skipped frames and lateness.
+
+        Returns:
+            dict: ticks, skipped, immediate, lateness_p50, lateness_p99, lateness_max (秒)
+        """
+        return self.scheduler.stats()
+
+    def get_switch_stats(self) -> dict:
+        """
+        获取波形组切换统计，延迟为从请求切换到新波形组首帧写入设备。
+        Get wave set switchover statistics, latency is from the request until its first frame is written.
+
+        Returns:
+            dict: {"A": 统计, "B": 统计}，包括switches, latency_p50, latency_p99, latency_max (秒)
+        """
+        return {"A": self.channelA_player.stats(), "B": self.channelB_player.stats()}
+
     async def close(self):
         """
         郊狼虽好，可不要贪杯哦。
@@ -355,15 +855,80 @@ class dglab(object):
             await self.wave_tasks
         except asyncio.CancelledError or asyncio.exceptions.InvalidStateError:
             pass
+        safety.unregister(self)
+        self.adapter_group.leave(self)
+        self.stop_recording()
+        self.close_control_block()
         await self.client.disconnect()
         return None
 
 
 class dglab_v3(object):
-    coyote = model_v3.Coyote()
+    channelA_wave_set = WaveSetSlot(WAVE_Z_MAX_V3)
+    channelB_wave_set = WaveSetSlot(WAVE_Z_MAX_V3)
+    channelA_frame_set = WaveSetSlot(WAVE_Z_MAX_V3)
+    channelB_frame_set = WaveSetSlot(WAVE_Z_MAX_V3)
 
-    def __init__(self, address: str = None) -> None:
+    def __init__(
+        self,
+        address: str = None,
+        tick_period: float = 0.1,
+        overload: str = "skip",
+        safety_budget: SafetyBudget = None,
+        adapter: str = None,
+        client: BleakClient = None,
+        clock: Clock = None,
+        switchover: str = "cycle_end",
+        crossfade_ticks: int = 10,
+        immediate_strength: bool = False,
+    ) -> None:
         self.address = address
+        # Injectable time source, e.g. pydglab.clock.VirtualClock for simulations.
+        self.clock = clock or system
+        # A ready-made client, e.g. pydglab.virtual.VirtualClient, replaces the BleakClient.
+        self.client = client
+        # Devices on one adapter are staggered and share an in-flight write cap.
+        self.adapter = adapter
+        self.adapter_group = adapter_.group(adapter)
+        # Checked when a wave set is loaded, and charged once per tick.
+        self.safety_budget = safety_budget
+        # Device state changes fan out to subscribers, see pydglab.events.
+        self.events = EventHub(parent=events.hub, clock=self.clock)
+        # Latched by emergency_stop(), output stays zero until cleared.
+        self.stopped: bool = False
+        self.stop_latency: float = None
+        self.coyote = model_v3.Coyote()
+        # Decide when a newly assigned wave or frame set takes over, see pydglab.player.
+        self.channelA_player = WavePlayer(
+            lambda: self.channelA_frame_set or self.channelA_wave_set,
+            switchover,
+            crossfade_ticks,
+            self.clock,
+        )
+        self.channelB_player = WavePlayer(
+            lambda: self.channelB_frame_set or self.channelB_wave_set,
+            switchover,
+            crossfade_ticks,
+            self.clock,
+        )
+        # Each 0xB0 packet carries 100ms of output, other periods change playback speed.
+        self.scheduler = TickScheduler(
+            self._tick, tick_period, overload, clock=self.clock, push=self._push
+        )
+        # Strength changes are written at once instead of on the next tick.
+        self.immediate_strength = immediate_strength
+        # Everything goes through one characteristic, so one write at a time.
+        self.pipeline = WritePipeline(1, limiter=self.adapter_group)
+        self._batch: Batch = None
+        self._pending_batches: list[Batch] = []
+        self._deferring = False
+        self._dirty: set[str] = set()
+        # Per-tick state is recorded here while a recording runs.
+        self.recorder: SessionRecorder = None
+        # Out-of-process clients steer the device through this, see pydglab.shm.
+        self.control_block: ControlBlock = None
+        # Last strength the device confirmed with 0xB1.
+        self.reported_strength: Tuple[int, int] = (0, 0)
         return None
 
     async def create(self) -> "dglab_v3":
@@ -384,11 +949,29 @@ class dglab_v3(object):
 
         # Connect to the device.
         logger.debug(f"Connecting to {self.address}")
-        self.client = BleakClient(self.address, timeout=20.0)
+        # The loop the device lives on, other loops hand calls over to it.
+        self.loop = asyncio.get_running_loop()
+        if self.client is None and self.adapter is None:
+            self.client = BleakClient(
+                self.address,
+                timeout=20.0,
+                disconnected_callback=self._disconnected_callback,
+            )
+        elif self.client is None:
+            self.client = BleakClient(
+                self.address,
+                timeout=20.0,
+                disconnected_callback=self._disconnected_callback,
+                adapter=self.adapter,
+            )
+        elif getattr(self.client, "disconnected_callback", False) is None:
+            # An injected client, e.g. a VirtualClient, reports to this device
+            # unless it was given a callback of its own.
+            self.client.disconnected_callback = self._disconnected_callback
         await self.client.connect()
 
         # Wait for a second to allow service discovery to complete
-        await asyncio.sleep(1)
+        await self.clock.sleep(1)
 
         # Check if the device is valid.
         services = self.client.services
@@ -400,13 +983,15 @@ class dglab_v3(object):
             logger.info("Connected to DGLAB v3.0")
 
             # Update BleakGATTCharacteristic into characteristics list, to optimize performence.
-            self.characteristics = CoyoteV3
+            self.characteristics = CoyoteV3()
             logger.debug(f"Got characteristics: {str(self.characteristics)}")
             for i in self.client.services.characteristics.values():
                 if i.uuid == self.characteristics.characteristicWrite:
                     self.characteristics.characteristicWrite = i
                 elif i.uuid == self.characteristics.characteristicNotify:
                     self.characteristics.characteristicNotify = i
+                elif i.uuid == self.characteristics.characteristicBattery:
+                    self.characteristics.characteristicBattery = i
 
         else:
             raise Exception(
@@ -415,6 +1000,20 @@ class dglab_v3(object):
 
         self.channelA_wave_set: list[tuple[int, int, int]] = []
         self.channelB_wave_set: list[tuple[int, int, int]] = []
+        self.channelA_frame_set: list[tuple[int, int]] = []
+        self.channelB_frame_set: list[tuple[int, int]] = []
+
+        # Slow-changing state is polled in the background, between tick writes.
+        self.tick_written = asyncio.Event()
+        self.telemetry = TelemetryPoller(
+            gate=self._tick_slot,
+            clock=self.clock,
+            on_update=lambda name, value: self.events.publish(self.address, name, value),
+        )
+        if CoyoteV3.serviceBattery in service:
+            self.telemetry.add(
+                "battery", self._read_batterylevel, urgent=lambda value: value <= 20
+            )
 
         # Initialize notify
         await v3.notify_(self.client, self.characteristics, self.notify_callback)
@@ -433,12 +1032,22 @@ class dglab_v3(object):
         await self.set_strength_sync(0, 0)
 
         # Start the wave tasks, to keep the device functioning.
+        safety.register(self)
+        self.adapter_group.join(self)
         self.wave_tasks = asyncio.gather(
             self._retainer(),
+            self.telemetry.run(),
         )
 
         return self
 
+    def _disconnected_callback(self, client: BleakClient) -> None:
+        """
+        Don't use this function directly.
+        """
+        logger.warning(f"Disconnected from {self.address}")
+        self.events.publish(self.address, "disconnect")
+
     @classmethod
     async def from_address(cls, address: str) -> "dglab_v3":
         """
@@ -456,19 +1065,62 @@ class dglab_v3(object):
         return cls(address)
 
     async def notify_callback(self, sender: BleakGATTCharacteristic, data: bytearray):
-        logger.debug(f"{sender}: {data}")
-        if data[0] == 0xB1:
-            # self.coyote.ChannelA.strength = int(data[2])
-            # self.coyote.ChannelB.strength = int(data[3])
-            logger.debug(f"Getting bytes(0xB1): {data.hex()} , which is {data}")
-        if data[0] == 0xBE:
-            # self.coyote.ChannelA.limit = int(data[1])
-            # self.coyote.ChannelB.limit = int(data[2])
-            # self.coyote.ChannelA.coefficientFrequency = int(data[3])
-            # self.coyote.ChannelB.coefficientFrequency = int(data[4])
-            # self.coyote.ChannelA.coefficientStrenth = int(data[5])
-            # self.coyote.ChannelB.coefficientStrenth = int(data[6])
-            logger.debug(f"Getting bytes(0xBE): {data.hex()} , which is {data}")
+        with trace.span("notify", "v3", self.address, packet=f"{data[0]:02X}"):
+            logger.debug(f"{sender}: {data}")
+            if data[0] == 0xB1:
+                # self.coyote.ChannelA.strength = int(data[2])
+                # self.coyote.ChannelB.strength = int(data[3])
+                logger.debug(f"Getting bytes(0xB1): {data.hex()} , which is {data}")
+                value = (int(data[2]), int(data[3]))
+                # Every 0xB0 is answered, only changes are worth an event.
+                if value != self.reported_strength:
+                    self.reported_strength = value
+                    self.events.publish(self.address, "strength", value)
+            if data[0] == 0xBE:
+                # self.coyote.ChannelA.limit = int(data[1])
+                # self.coyote.ChannelB.limit = int(data[2])
+                # self.coyote.ChannelA.coefficientFrequency = int(data[3])
+                # self.coyote.ChannelB.coefficientFrequency = int(data[4])
+                # self.coyote.ChannelA.coefficientStrenth = int(data[5])
+                # self.coyote.ChannelB.coefficientStrenth = int(data[6])
+                logger.debug(f"Getting bytes(0xBE): {data.hex()} , which is {data}")
+                self.events.publish(self.address, "limits", tuple(data[1:7]))
+
+    async def get_batterylevel(self) -> int:
+        """
+        读取郊狼设备剩余电量，小心没电导致的寸止哦：）
+        Retrieves the battery level from the device.
+
+        Returns:
+            int: The battery level as an integer value.
+        """
+
+        value = await self._read_batterylevel()
+        self.telemetry.update("battery", value)
+        return value
+
+    async def _read_batterylevel(self) -> int:
+        """
+        Don't use this function directly.
+        """
+        value = await v3.get_batterylevel_(self.client, self.characteristics)
+        value = value[0]
+        logger.debug(f"Received battery level: {value}")
+        self.coyote.Battery = int(value)
+        return self.coyote.Battery
+
+    async def _tick_slot(self) -> None:
+        """
+        Don't use this function directly.
+
+        Waits until the current tick has been written, so a read
+        issued afterwards does not delay the next frame.
+        """
+        self.tick_written.clear()
+        try:
+            await asyncio.wait_for(self.tick_written.wait(), 1)
+        except asyncio.TimeoutError:
+            pass
 
     async def get_strength(self) -> Tuple[int, int]:
         """
@@ -480,7 +1132,23 @@ class dglab_v3(object):
         """
         return self.coyote.ChannelA.strength, self.coyote.ChannelB.strength
 
-    async def set_strength(self, strength: int, channel: model_v3.ChannelA | model_v3.ChannelB) -> None:
+    def get_state(self) -> model_v3.CoyoteState:
+        """
+        获取当前设备状态的紧凑快照，不产生蓝牙通信。
+        Take a compact snapshot of the device state, without touching BLE.
+
+        Returns:
+            CoyoteState: 设备状态
+        """
+        return self.coyote.snapshot()
+
+    @batchable
+    async def set_strength(
+        self,
+        strength: int,
+        channel: model_v3.ChannelA | model_v3.ChannelB,
+        immediate: bool = None,
+    ) -> None:
         """
         设置电压强度。
         额外设置这个函数用于单独调整强度只是为了和设置波形的函数保持一致罢了。
@@ -489,6 +1157,7 @@ class dglab_v3(object):
         Args:
             strength (int): 电压强度
             channel (ChannelA | ChannelB): 对手频道
+            immediate (bool): 是否立即写入而不等待下一个tick，默认为immediate_strength
 
         Returns:
             int: 电压强度
@@ -498,12 +1167,14 @@ class dglab_v3(object):
             self.coyote.ChannelA.strength = strength
         elif channel is model_v3.ChannelB:
             self.coyote.ChannelB.strength = strength
+        self._push_strength(immediate)
         return (
             self.coyote.ChannelA.strength
             if channel is model_v3.ChannelA
             else self.coyote.ChannelB.strength
         )
 
+    @batchable
     async def set_coefficient(
         self,
         strength_limit: int,
@@ -534,7 +1205,12 @@ class dglab_v3(object):
             self.coyote.ChannelB.coefficientStrenth = strength_coefficient
             self.coyote.ChannelB.coefficientFrequency = frequency_coefficient
 
-        await v3.write_coefficient_(self.client, self.coyote, self.characteristics)
+        if self._deferring:
+            self._dirty.add("coefficient")
+        else:
+            await self.pipeline.submit(
+                "write", v3.write_coefficient_, self.client, self.coyote, self.characteristics
+            )
 
         return (
             (
@@ -550,7 +1226,10 @@ class dglab_v3(object):
             )
         )
 
-    async def set_strength_sync(self, strengthA: int, strengthB: int) -> None:
+    @batchable
+    async def set_strength_sync(
+        self, strengthA: int, strengthB: int, immediate: bool = None
+    ) -> None:
         """
         同步设置电流强度。
         这是正道。
@@ -559,14 +1238,43 @@ class dglab_v3(object):
         Args:
             strengthA (int): 通道A电压强度
             strengthB (int): 通道B电压强度
+            immediate (bool): 是否立即写入而不等待下一个tick，默认为immediate_strength
 
         Returns:
             (int, int): A通道强度，B通道强度
         """
         self.coyote.ChannelA.strength = strengthA
         self.coyote.ChannelB.strength = strengthB
+        self._push_strength(immediate)
         return self.coyote.ChannelA.strength, self.coyote.ChannelB.strength
 
+    def _push_strength(self, immediate: bool = None) -> None:
+        """
+        Don't use this function directly.
+
+        Resends the sub-frames of the last tick with the new strength right away,
+        at most once per tick period, see TickScheduler.push_now(). The frames
+        do not advance and the ticks stay where they are.
+        """
+        if immediate is None:
+            immediate = self.immediate_strength
+        if immediate and not self._deferring:
+            self.scheduler.push_now()
+        return None
+
+    async def _push(self) -> None:
+        """
+        Don't use this function directly.
+        """
+        if self.stopped:
+            # Latched at zero, there is nothing to push.
+            return None
+        with trace.span("push", "v3", self.address):
+            await self.pipeline.submit(
+                "write", v3.write_strenth_, self.client, self.coyote, self.characteristics
+            )
+        return None
+
     """
     How wave set works:
     1. Set the wave set for channel A and channel B.
@@ -575,8 +1283,13 @@ class dglab_v3(object):
     self.coyote.ChannelN.waveN.
     """
 
+    @batchable
     async def set_wave_set(
-        self, wave_set: list[tuple[int, int, int]], channel: model_v3.ChannelA | model_v3.ChannelB
+        self,
+        wave_set: list[tuple[int, int, int]],
+        channel: model_v3.ChannelA | model_v3.ChannelB,
+        switchover: str = None,
+        ticks: int = None,
     ) -> None:
         """
         设置波形组，也就是所谓“不断变化的波形”。
@@ -585,20 +1298,29 @@ class dglab_v3(object):
         Args:
             wave_set (list[tuple[int, int, int]]): 波形组
             channel (ChannelA | ChannelB): 对手通道
+            switchover (str): 切换方式，immediate，cycle_end或crossfade，默认为构造时指定的方式，批量修改中为immediate
+            ticks (int): crossfade持续的tick数
 
         Returns:
             None: None
         """
         if channel is model_v3.ChannelA:
+            self.channelA_player.request(self._switchover(switchover), ticks)
             self.channelA_wave_set = wave_set
+            self.channelA_frame_set = []
         elif channel is model_v3.ChannelB:
+            self.channelB_player.request(self._switchover(switchover), ticks)
             self.channelB_wave_set = wave_set
+            self.channelB_frame_set = []
         return None
 
+    @batchable
     async def set_wave_set_sync(
         self,
         wave_setA: list[tuple[int, int, int]],
         wave_setB: list[tuple[int, int, int]],
+        switchover: str = None,
+        ticks: int = None,
     ) -> None:
         """
         同步设置波形组。
@@ -607,12 +1329,18 @@ class dglab_v3(object):
         Args:
             wave_setA (list[tuple[int, int, int]]): 通道A波形组
             wave_setB (list[tuple[int, int, int]]): 通道B波形组
+            switchover (str): 切换方式，immediate，cycle_end或crossfade
+            ticks (int): crossfade持续的tick数
 
         Returns:
             None: None
         """
+        self.channelA_player.request(self._switchover(switchover), ticks)
+        self.channelB_player.request(self._switchover(switchover), ticks)
         self.channelA_wave_set = wave_setA
+        self.channelA_frame_set = []
         self.channelB_wave_set = wave_setB
+        self.channelB_frame_set = []
         return None
 
     def waveset_converter(
@@ -633,6 +1361,7 @@ class dglab_v3(object):
     All the wave changes will be applied to the device by wave_set.
     """
 
+    @batchable
     async def set_wave(
         self, waveX: int, waveY: int, waveZ: int, channel: model_v3.ChannelA | model_v3.ChannelB
     ) -> Tuple[int, int, int]:
@@ -651,11 +1380,16 @@ class dglab_v3(object):
             Tuple[int, int, int]: 波形
         """
         if channel is model_v3.ChannelA:
+            self.channelA_player.request(self._switchover())
             self.channelA_wave_set = [(waveX, waveY, waveZ)]
+            self.channelA_frame_set = []
         elif channel is model_v3.ChannelB:
+            self.channelB_player.request(self._switchover())
             self.channelB_wave_set = [(waveX, waveY, waveZ)]
+            self.channelB_frame_set = []
         return waveX, waveY, waveZ
 
+    @batchable
     async def set_wave_sync(
         self,
         waveX_A: int,
@@ -680,10 +1414,116 @@ class dglab_v3(object):
         Returns:
             Tuple[Tuple[int, int, int], Tuple[int, int, int]]: A通道波形，B通道波形
         """
+        self.channelA_player.request(self._switchover())
+        self.channelB_player.request(self._switchover())
         self.channelA_wave_set = [(waveX_A, waveY_A, waveZ_A)]
+        self.channelA_frame_set = []
         self.channelB_wave_set = [(waveX_B, waveY_B, waveZ_B)]
+        self.channelB_frame_set = []
         return (waveX_A, waveY_A, waveZ_A), (waveX_B, waveY_B, waveZ_B)
 
+    """
+    How frame set works:
+    A 0xB0 packet carries four 25ms sub-frames per channel.
+    The legacy wave set only shifts one new value in per tick,
+    while a frame set fills all four sub-frames every tick,
+    so a 40Hz (frequency, intensity) stream is played as is.
+    """
+
+    @batchable
+    async def set_frame_set(
+        self,
+        frame_set: list[tuple[int, int]],
+        channel: model_v3.ChannelA | model_v3.ChannelB,
+        switchover: str = None,
+        ticks: int = None,
+    ) -> None:
+        """
+        设置原生25ms子帧组，每个tick填满全部4个子帧。
+        Set a native 25ms sub-frame set, all four sub-frames are filled every tick.
+
+        Args:
+            frame_set (list[tuple[int, int]]): 子帧组，(频率 10-240, 强度 0-100)，每项持续25ms
+            channel (ChannelA | ChannelB): 对手通道
+            switchover (str): 切换方式，immediate，cycle_end或crossfade，默认为构造时指定的方式，批量修改中为immediate
+            ticks (int): crossfade持续的tick数
+
+        Returns:
+            None: None
+        """
+        if channel is model_v3.ChannelA:
+            self.channelA_player.request(self._switchover(switchover), ticks)
+            self.channelA_frame_set = frame_set
+        elif channel is model_v3.ChannelB:
+            self.channelB_player.request(self._switchover(switchover), ticks)
+            self.channelB_frame_set = frame_set
+        return None
+
+    @batchable
+    async def set_frame_set_sync(
+        self,
+        frame_setA: list[tuple[int, int]],
+        frame_setB: list[tuple[int, int]],
+        switchover: str = None,
+        ticks: int = None,
+    ) -> None:
+        """
+        同步设置原生25ms子帧组。
+        Set the native 25ms sub-frame sets synchronously.
+
+        Args:
+            frame_setA (list[tuple[int, int]]): 通道A子帧组
+            frame_setB (list[tuple[int, int]]): 通道B子帧组
+            switchover (str): 切换方式，immediate，cycle_end或crossfade
+            ticks (int): crossfade持续的tick数
+
+        Returns:
+            None: None
+        """
+        self.channelA_player.request(self._switchover(switchover), ticks)
+        self.channelB_player.request(self._switchover(switchover), ticks)
+        self.channelA_frame_set = frame_setA
+        self.channelB_frame_set = frame_setB
+        return None
+
+    def _play_frame(self, channel: model_v3.Channel, player: WavePlayer, frame: tuple) -> None:
+        """
+        Do not use this function directly.
+
+        Sub-frames fill all four slots of the tick, a v2 style wave shifts in as one slot.
+        """
+        if frame is None:
+            return None
+        if len(frame) == 2:
+            chunk = [frame]
+            while len(chunk) < 4:
+                sub_frame = next(player)
+                if sub_frame is None or len(sub_frame) != 2:
+                    # Switched to something else mid-tick, hold the last sub-frame.
+                    chunk += chunk[-1:] * (4 - len(chunk))
+                    break
+                chunk.append(sub_frame)
+            for slot, (frequency, intensity) in enumerate(chunk):
+                channel.wave[slot] = min(max(int(frequency), 10), 240)
+                channel.waveStrenth[slot] = min(max(int(intensity), 0), 100)
+            return None
+        frame = self.waveset_converter(frame)
+        channel.wave.insert(0, frame[0])
+        channel.wave.pop()
+        channel.waveStrenth.insert(0, frame[1])
+        channel.waveStrenth.pop()
+        return None
+
+    def _switchover(self, switchover: str = None) -> str:
+        """
+        Don't use this function directly.
+
+        Sets staged in a batch switch right away, so they play on the tick that commits it.
+        """
+        if switchover is None and self._deferring:
+            return "immediate"
+        return switchover
+
     def _channelA_wave_set_handler(self):
         """
         Do not use this function directly.
@@ -692,14 +1532,9 @@ class dglab_v3(object):
         PR if you have a better solution.
         """
         try:
-            while True:
-                for wave in self.channelA_wave_set:
-                    wave = self.waveset_converter(wave)
-                    self.coyote.ChannelA.wave.insert(0, wave[0])
-                    self.coyote.ChannelA.wave.pop()
-                    self.coyote.ChannelA.waveStrenth.insert(0, wave[1])
-                    self.coyote.ChannelA.waveStrenth.pop()
-                    yield (None)
+            for frame in self.channelA_player:
+                self._play_frame(self.coyote.ChannelA, self.channelA_player, frame)
+                yield (None)
         except asyncio.exceptions.CancelledError:
             pass
 
@@ -711,14 +1546,9 @@ class dglab_v3(object):
         PR if you have a better solution.
         """
         try:
-            while True:
-                for wave in self.channelB_wave_set:
-                    wave = self.waveset_converter(wave)
-                    self.coyote.ChannelB.wave.insert(0, wave[0])
-                    self.coyote.ChannelB.wave.pop()
-                    self.coyote.ChannelB.waveStrenth.insert(0, wave[1])
-                    self.coyote.ChannelB.waveStrenth.pop()
-                    yield (None)
+            for frame in self.channelB_player:
+                self._play_frame(self.coyote.ChannelB, self.channelB_player, frame)
+                yield (None)
         except asyncio.exceptions.CancelledError:
             pass
 
@@ -726,28 +1556,291 @@ class dglab_v3(object):
         """
         Don't use this function directly.
         """
-        ChannelA_keeping = self._channelA_wave_set_handler()
-        ChannelB_keeping = self._channelB_wave_set_handler()
-
-        last_time = time.time()
+        self._ChannelA_keeping = self._channelA_wave_set_handler()
+        self._ChannelB_keeping = self._channelB_wave_set_handler()
 
-        while True:
-            if time.time() - last_time >= 0.1:
+        await self.scheduler.run()
+        return None
 
-                # Record time for loop
-                last_time = time.time()
-                logger.debug(
-                    f"Using wave: {self.coyote.ChannelA.wave}, {self.coyote.ChannelA.waveStrenth}, {self.coyote.ChannelB.wave}, {self.coyote.ChannelB.waveStrenth}"
-                )
-                r = await v3.write_strenth_(
-                    self.client, self.coyote, self.characteristics
+    async def _tick(self, skipped: int) -> None:
+        """
+        Don't use this function directly.
+        """
+        # Frames whose deadline already passed are dropped, not sent late.
+        for _ in range(skipped):
+            next(self._ChannelA_keeping)
+            next(self._ChannelB_keeping)
+
+        if self.control_block is not None:
+            await self._apply_control()
+        dirty, batches = await apply_(self)
+        # The frame for this tick is pulled right before it is written, so
+        # whatever was applied above already plays on this tick.
+        with trace.span("next_frame", "v3", self.address):
+            next(self._ChannelA_keeping)
+            next(self._ChannelB_keeping)
+        logger.debug(
+            f"Using wave: {self.coyote.ChannelA.wave}, {self.coyote.ChannelA.waveStrenth}, {self.coyote.ChannelB.wave}, {self.coyote.ChannelB.waveStrenth}"
+        )
+        if self.safety_budget is not None and not self.safety_budget.charge(
+            self._tick_energy()
+        ):
+            for slot in range(4):
+                self.coyote.ChannelA.waveStrenth[slot] = 0
+                self.coyote.ChannelB.waveStrenth[slot] = 0
+        if self.stopped:
+            self._zero()
+
+        with trace.span("tick", "v3", self.address):
+            try:
+                # Both channels share one 0xBF, written right before the 0xB0 it belongs to.
+                if "coefficient" in dirty:
+                    await self.pipeline.submit(
+                        "write", v3.write_coefficient_, self.client, self.coyote, self.characteristics
+                    )
+                r = await self.pipeline.submit(
+                    "write", v3.write_strenth_, self.client, self.coyote, self.characteristics
                 )
-                logger.debug(f"Retainer response: {r}")
-                next(ChannelA_keeping)
-                next(ChannelB_keeping)
+            except Exception as e:
+                commit_(batches, e)
+                self._record(ACK_FAILED)
+                raise
+            commit_(batches)
+            self._record(ACK_WRITTEN)
+            self._mirror_control()
+            logger.debug(f"Retainer response: {r}")
+            self.channelA_player.written()
+            self.channelB_player.written()
+            self.tick_written.set()
+        return None
+
+    def batch(self) -> Batch:
+        """
+        开启一次批量修改，退出时在同一个tick内一次性生效。
+        Open a batch, staged changes are applied together on one tick on exit.
+
+        Usage:
+            async with dglab_instance.batch():
+                await dglab_instance.set_strength_sync(10, 10)
+                await dglab_instance.set_coefficient(100, 100, 100, model_v3.ChannelA)
+                await dglab_instance.set_coefficient(100, 100, 100, model_v3.ChannelB)
+
+        Returns:
+            Batch: 批量修改上下文
+        """
+        return Batch(self)
+
+    def start_recording(self, path: str, chunk_size: int = 4096) -> SessionRecorder:
+        """
+        开始逐tick记录设备状态，可用numpy直接读取。
+        Record the state of every tick into NumPy-compatible columns, see pydglab.recorder.
+
+        Args:
+            path (str): 会话目录，结束时打包为<path>.npz
+            chunk_size (int): 每次写入磁盘的行数
+
+        Returns:
+            SessionRecorder: 记录器
+        """
+        if self.recorder is not None:
+            raise Exception("A recording is already running on this device")
+        self.recorder = SessionRecorder(path, COLUMNS_V3, chunk_size)
+        return self.recorder
+
+    def stop_recording(self, pack: bool = True) -> str:
+        """
+        结束记录。
+        Stop recording.
+
+        Args:
+            pack (bool): 是否打包为.npz
+
+        Returns:
+            str: 记录文件路径
+        """
+        recorder, self.recorder = self.recorder, None
+        return None if recorder is None else recorder.close(pack)
+
+    def _record(self, ack: int) -> None:
+        """
+        Don't use this function directly.
+        """
+        if self.recorder is None:
+            return None
+        a, b = self.coyote.ChannelA, self.coyote.ChannelB
+        try:
+            self.recorder.append(
+                self.clock.time(), ack, a.strength, b.strength, *self.reported_strength,
+                a.wave, a.waveStrenth, b.wave, b.waveStrenth,
+            )
+        except Exception as e:
+            # The row is dropped as a whole, recording never stops the tick loop.
+            logger.error(f"Tick not recorded: {e}")
+        return None
+
+    def open_control_block(self, path: str, wave_sets=()) -> ControlBlock:
+        """
+        开放一个内存映射控制块，供其他进程无系统调用地控制设备。
+        Expose a memory-mapped control block, read once per tick, see pydglab.shm.
+
+        Args:
+            path (str): 控制块文件路径，例如/dev/shm下的文件
+            wave_sets (Sequence): 可通过槽位序号选择的波形组
+
+        Returns:
+            ControlBlock: 控制块
+
+        Raises:
+            BudgetExceeded: 某个波形组超出safety_budget
+        """
+        if self.control_block is not None:
+            raise Exception("A control block is already open on this device")
+        # Checked up front, a slot the budget rejects must not fail inside a tick.
+        wave_sets = [type(self).channelA_wave_set.load(self, wave_set) for wave_set in wave_sets]
+        self.control_block = ControlBlock(path, wave_sets)
+        return self.control_block
+
+    def close_control_block(self) -> None:
+        control_block, self.control_block = self.control_block, None
+        if control_block is not None:
+            control_block.close()
+        return None
+
+    async def _apply_control(self) -> None:
+        """
+        Don't use this function directly.
+
+        Applies what a client wrote since the last tick, as part of this tick.
+        """
+        values = self.control_block.poll()
+        if values is None:
+            return None
+        strengthA, strengthB, slotA, slotB = values
+        self._deferring = True
+        try:
+            for index, (channel, slot) in enumerate(
+                ((model_v3.ChannelA, slotA), (model_v3.ChannelB, slotB))
+            ):
+                wave_set = self.control_block.slot(index, slot)
+                if wave_set is None:
+                    continue
+                try:
+                    # Unwrapped, so an open batch does not swallow the change.
+                    await type(self).set_wave_set.__wrapped__(self, wave_set, channel)
+                except BudgetExceeded as e:
+                    logger.error(f"Control block slot {slot} rejected, keeping the current set: {e}")
+                    continue
+                self.control_block.slots[index] = slot
+            await type(self).set_strength_sync.__wrapped__(
+                self, min(strengthA, 200), min(strengthB, 200)
+            )
+        finally:
+            self._deferring = False
+        return None
 
+    def _mirror_control(self) -> None:
+        """
+        Don't use this function directly.
+        """
+        if self.control_block is None:
+            return None
+        a, b = self.coyote.ChannelA, self.coyote.ChannelB
+        self.control_block.mirror(
+            ControlState(
+                self.scheduler.ticks & 0xFFFFFFFF,
+                a.strength,
+                b.strength,
+                *self.reported_strength,
+                *self.control_block.slots,
+                self.coyote.Battery or 0,
+                self.stopped,
+                self.clock.time(),
+            )
+        )
         return None
 
+    def _tick_energy(self) -> float:
+        """
+        Don't use this function directly.
+
+        Energy of the coming tick, from the statistics cached on the wave sets.
+        """
+        statsA = (self.channelA_frame_set or self.channelA_wave_set).stats
+        statsB = (self.channelB_frame_set or self.channelB_wave_set).stats
+        return (
+            statsA.energy_per_tick * (self.coyote.ChannelA.strength or 0)
+            + statsB.energy_per_tick * (self.coyote.ChannelB.strength or 0)
+        ) / 200
+
+    async def emergency_stop(self) -> float:
+        """
+        紧急停止：跳过调度与写入队列，立即将强度与波形归零，并保持锁定直到clear_emergency_stop()。
+        Zero strength and waveform immediately, bypassing the scheduler and the write queue.
+        Output stays latched at zero until clear_emergency_stop() is called.
+
+        Returns:
+            float: 停止延迟(秒)，从调用到写入完成
+        """
+        started = time.perf_counter()
+        self.stopped = True
+        self._zero()
+        await v3.write_stop_(self.client, self.characteristics)
+        self.stop_latency = time.perf_counter() - started
+        self.events.publish(self.address, "emergency_stop", self.stop_latency)
+        logger.warning(f"Emergency stop on {self.address} in {self.stop_latency * 1000:.1f}ms")
+        return self.stop_latency
+
+    async def clear_emergency_stop(self) -> None:
+        """
+        解除紧急停止锁定，强度保持为0，需要重新设置。
+        Release the emergency stop latch, strength stays 0 until set again.
+
+        Returns:
+            None: None
+        """
+        self.stopped = False
+        return None
+
+    def _zero(self) -> None:
+        """
+        Don't use this function directly.
+        """
+        self.coyote.ChannelA.strength = 0
+        self.coyote.ChannelB.strength = 0
+        for slot in range(4):
+            self.coyote.ChannelA.waveStrenth[slot] = 0
+            self.coyote.ChannelB.waveStrenth[slot] = 0
+
+    def get_write_timings(self) -> list:
+        """
+        获取最近的写入耗时记录。
+        Get timing of the recent writes.
+
+        Returns:
+            list[WriteTiming]: (key, queued, started, finished)
+        """
+        return list(self.pipeline.timings)
+
+    def get_tick_stats(self) -> dict:
+        """
+        获取tick调度统计，包括跳过的帧数与延迟。
+        Get tick statistics, including skipped frames and lateness.
+
+        Returns:
+            dict: ticks, skipped, immediate, lateness_p50, lateness_p99, lateness_max (秒)
+        """
+        return self.scheduler.stats()
+
+    def get_switch_stats(self) -> dict:
+        """
+        获取波形组切换统计，延迟为从请求切换到新波形组首帧写入设备。
+        Get wave set switchover statistics, latency is from the request until its first frame is written.
+
+        Returns:
+            dict: {"A": 统计, "B": 统计}，包括switches, latency_p50, latency_p99, latency_max (秒)
+        """
+        return {"A": self.channelA_player.stats(), "B": self.channelB_player.stats()}
+
     async def close(self) -> None:
         """
         郊狼虽好，可不要贪杯哦。
@@ -761,5 +1854,9 @@ class dglab_v3(object):
             await self.wave_tasks
         except asyncio.CancelledError or asyncio.exceptions.InvalidStateError:
             pass
+        safety.unregister(self)
+        self.adapter_group.leave(self)
+        self.stop_recording()
+        self.close_control_block()
         await self.client.disconnect()
         return None
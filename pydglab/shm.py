@@ -0,0 +1,200 @@
+"""
+Memory-mapped control block, for clients in another process.
+
+The driver maps a small file per device. A client (a game engine, another
+Python process, anything that can mmap a file) writes target strengths
+and wave set slot indices into it, the tick loop picks them up once per
+tick, and mirrors the device state back, all without syscalls:
+
+    block = dglab_instance.open_control_block("/dev/shm/coyote-a", [wave_set0, wave_set1])
+
+    client = ControlClient("/dev/shm/coyote-a")  # in the other process
+    client.set(20, 10, slot_a=1)
+    client.state().strength_a
+
+Layout (little-endian, 64 bytes):
+
+    0   4s  magic b"DGLB"
+    4   H   layout version
+    6   H   block size
+    -- control, written by the client --
+    8   I   sequence, odd while a write is in progress
+    12  H   strength A
+    14  H   strength B
+    16  h   wave set slot A, -1 keeps the current set
+    18  h   wave set slot B, -1 keeps the current set
+    -- state, written by the driver --
+    32  I   sequence, odd while a write is in progress
+    36  I   ticks
+    40  H   strength A
+    42  H   strength B
+    44  H   strength A reported by the device
+    46  H   strength B reported by the device
+    48  h   wave set slot A
+    50  h   wave set slot B
+    52  B   battery
+    53  B   emergency stopped
+    56  d   timestamp
+
+Both halves are seqlocks: the writer makes the sequence odd, writes the
+fields, then makes it even again, and a reader retries (or, in the tick
+loop, waits for the next tick) when the sequence is odd or changed
+underneath it. Each half has exactly one writer.
+"""
+
+import logging, mmap, os, struct
+from typing import NamedTuple, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"DGLB"
+LAYOUT_VERSION = 1
+BLOCK_SIZE = 64
+
+_HEADER = struct.Struct("<4sHH")
+_SEQUENCE = struct.Struct("<I")
+CONTROL_SEQUENCE = 8
+_CONTROL = struct.Struct("<HHhh")
+CONTROL_DATA = 12
+STATE_SEQUENCE = 32
+_STATE = struct.Struct("<IHHHHhhBB2xd")
+STATE_DATA = 36
+
+STRENGTH_MAX = 200
+KEEP = -1
+
+
+class ControlState(NamedTuple):
+    ticks: int
+    strength_a: int
+    strength_b: int
+    reported_a: int
+    reported_b: int
+    slot_a: int
+    slot_b: int
+    battery: int
+    stopped: bool
+    timestamp: float
+
+
+def _map(path: str, create: bool) -> mmap.mmap:
+    if create:
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, LAYOUT_VERSION, BLOCK_SIZE).ljust(BLOCK_SIZE, b"\0"))
+    with open(path, "r+b") as f:
+        buffer = mmap.mmap(f.fileno(), BLOCK_SIZE)
+    magic, version, size = _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != LAYOUT_VERSION or size != BLOCK_SIZE:
+        buffer.close()
+        raise Exception(f"{path} is not a control block of layout {LAYOUT_VERSION}")
+    return buffer
+
+
+class ControlBlock(object):
+    """
+    The driver side, see dglab.open_control_block().
+    """
+
+    def __init__(self, path: str, wave_sets: Sequence = ()) -> None:
+        """
+        Args:
+            path (str): 控制块文件路径，例如/dev/shm下的文件
+            wave_sets (Sequence): 可通过槽位序号选择的波形组
+        """
+        self.path = path
+        self.wave_sets = list(wave_sets)
+        self.slots = [KEEP, KEEP]
+        self._buffer = _map(path, create=True)
+        self._control_sequence = 0
+        self._state_sequence = 0
+        return None
+
+    def poll(self) -> Optional[tuple]:
+        """
+        (strength A, strength B, slot A, slot B) if the client wrote something new, else None.
+        """
+        sequence = _SEQUENCE.unpack_from(self._buffer, CONTROL_SEQUENCE)[0]
+        if sequence == self._control_sequence or sequence & 1:
+            return None
+        values = _CONTROL.unpack_from(self._buffer, CONTROL_DATA)
+        if _SEQUENCE.unpack_from(self._buffer, CONTROL_SEQUENCE)[0] != sequence:
+            # Torn read, the next tick tries again.
+            return None
+        self._control_sequence = sequence
+        return values
+
+    def slot(self, channel: int, index: int):
+        """
+        The wave set for a slot index, None to keep the current one.
+        The caller records `slots[channel]` once the set is playing.
+        """
+        if index == KEEP or index == self.slots[channel]:
+            return None
+        if not 0 <= index < len(self.wave_sets):
+            logger.warning(f"Control block {self.path}: no wave set in slot {index}")
+            return None
+        return self.wave_sets[index]
+
+    def mirror(self, state: ControlState) -> None:
+        self._state_sequence += 1
+        _SEQUENCE.pack_into(self._buffer, STATE_SEQUENCE, self._state_sequence)
+        _STATE.pack_into(self._buffer, STATE_DATA, *state)
+        self._state_sequence += 1
+        _SEQUENCE.pack_into(self._buffer, STATE_SEQUENCE, self._state_sequence)
+        return None
+
+    def close(self, remove: bool = True) -> None:
+        self._buffer.close()
+        if remove:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+        return None
+
+
+class ControlClient(object):
+    """
+    The client side, for Python clients in another process.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._buffer = _map(path, create=False)
+        self._sequence = _SEQUENCE.unpack_from(self._buffer, CONTROL_SEQUENCE)[0] & ~1
+        return None
+
+    def set(self, strength_a: int, strength_b: int, slot_a: int = KEEP, slot_b: int = KEEP) -> None:
+        """
+        写入目标强度与波形组槽位。
+        Write target strengths and wave set slots, picked up on the next tick.
+
+        Args:
+            strength_a (int): 通道A目标强度
+            strength_b (int): 通道B目标强度
+            slot_a (int): 通道A波形组槽位，-1保持不变
+            slot_b (int): 通道B波形组槽位，-1保持不变
+        """
+        self._sequence += 1
+        _SEQUENCE.pack_into(self._buffer, CONTROL_SEQUENCE, self._sequence)
+        _CONTROL.pack_into(self._buffer, CONTROL_DATA, strength_a, strength_b, slot_a, slot_b)
+        self._sequence += 1
+        _SEQUENCE.pack_into(self._buffer, CONTROL_SEQUENCE, self._sequence)
+        return None
+
+    def state(self) -> ControlState:
+        """
+        读取驱动镜像的设备状态。
+        Read the device state mirrored by the driver.
+        """
+        while True:
+            sequence = _SEQUENCE.unpack_from(self._buffer, STATE_SEQUENCE)[0]
+            if sequence & 1:
+                continue
+            values = _STATE.unpack_from(self._buffer, STATE_DATA)
+            if _SEQUENCE.unpack_from(self._buffer, STATE_SEQUENCE)[0] == sequence:
+                return ControlState(*values[:8], bool(values[8]), values[9])
+
+    def close(self) -> None:
+        self._buffer.close()
+        return None
@@ -0,0 +1,130 @@
+import logging, asyncio
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from pydglab.clock import Clock, system
+
+logger = logging.getLogger(__name__)
+
+
+class _Source(object):
+    __slots__ = ("name", "read", "urgent", "interval", "due")
+
+    def __init__(self, name, read, urgent, interval):
+        self.name: str = name
+        self.read: Callable[[], Awaitable[Any]] = read
+        self.urgent: Optional[Callable[[Any], bool]] = urgent
+        self.interval: float = interval
+        self.due: float = 0.0
+
+
+class TelemetryPoller(object):
+    """
+    Background reader for slow-changing device state, e.g. battery level.
+
+    Every source is read on its own adaptive interval: it shrinks to
+    `min_interval` when the value changed or is urgent (e.g. battery low),
+    and doubles up to `max_interval` while the value stays the same.
+    Reads wait for `gate`, so they are slotted right after a tick write
+    instead of delaying the next frame.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 5.0,
+        max_interval: float = 60.0,
+        gate: Callable[[], Awaitable[None]] = None,
+        on_update: Callable[[str, Any], None] = None,
+        clock: Clock = None,
+    ) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.gate = gate
+        self.on_update = on_update
+        self.clock = clock or system
+        self.values: dict[str, Any] = {}
+        self.timestamps: dict[str, float] = {}
+        self.last_update: Optional[Tuple[str, Any]] = None
+        self._sources: list[_Source] = []
+        self._update = asyncio.Event()
+        return None
+
+    def add(
+        self,
+        name: str,
+        read: Callable[[], Awaitable[Any]],
+        urgent: Callable[[Any], bool] = None,
+    ) -> None:
+        """
+        添加一个遥测数据源。
+        Add a telemetry source.
+
+        Args:
+            name (str): 数据名称
+            read (Callable[[], Awaitable[Any]]): 读取协程函数
+            urgent (Callable[[Any], bool]): 返回True时以最短间隔读取，例如电量过低
+
+        Returns:
+            None: None
+        """
+        self._sources.append(_Source(name, read, urgent, self.min_interval))
+        return None
+
+    def update(self, name: str, value: Any) -> None:
+        """
+        Record a value, also used by explicit reads outside the poller.
+        """
+        changed = self.values.get(name) != value
+        self.values[name] = value
+        self.timestamps[name] = self.clock.time()
+        for source in self._sources:
+            if source.name == name:
+                self._reschedule(source, value, changed)
+        if changed:
+            self.last_update = (name, value)
+            if self.on_update is not None:
+                self.on_update(name, value)
+            # Swap the event, so every waiter wakes once per update.
+            event, self._update = self._update, asyncio.Event()
+            event.set()
+        return None
+
+    async def wait_for_update(self) -> Tuple[str, Any]:
+        """
+        等待任一遥测数据变化。
+        Wait until any telemetry value changes.
+
+        Returns:
+            Tuple[str, Any]: (数据名称, 新值)
+        """
+        await self._update.wait()
+        return self.last_update
+
+    def _reschedule(self, source: _Source, value: Any, changed: bool) -> None:
+        if changed or (source.urgent is not None and source.urgent(value)):
+            source.interval = self.min_interval
+        else:
+            source.interval = min(source.interval * 2, self.max_interval)
+        source.due = self.clock.time() + source.interval
+
+    async def run(self) -> None:
+        """
+        Don't use this function directly.
+        """
+        if not self._sources:
+            return None
+        while True:
+            source = min(self._sources, key=lambda source: source.due)
+            delay = source.due - self.clock.time()
+            if delay > 0:
+                await self.clock.sleep(delay)
+            if self.gate is not None:
+                await self.gate()
+            try:
+                value = await source.read()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Telemetry read {source.name} failed: {e}")
+                source.due = self.clock.time() + self.min_interval
+                continue
+            self.update(source.name, value)
@@ -0,0 +1,185 @@
+"""
+Opt-in tick level tracer, writing the Chrome trace-event JSON format.
+
+Open the output with chrome://tracing or https://ui.perfetto.dev.
+Every device gets its own lane, named after its address.
+"""
+
+import logging, json, os, time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Span(object):
+    __slots__ = ("tracer", "name", "cat", "tid", "args", "start")
+
+    def __init__(self, tracer, name, cat, tid, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.tid = tid
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        event = {
+            "name": self.name,
+            "cat": self.cat,
+            "ph": "X",
+            "ts": self.start / 1000,
+            "dur": (end - self.start) / 1000,
+            "pid": self.tracer.pid,
+            "tid": self.tid,
+        }
+        if self.args:
+            event["args"] = self.args
+        self.tracer._record(event)
+        return False
+
+
+class _NullSpan(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer(object):
+    """
+    Buffers trace events in memory and appends them to `path` in bulk.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 4096) -> None:
+        self.path = path
+        self.buffer_size = buffer_size
+        self.pid = os.getpid()
+        self._events: list[dict] = []
+        self._lanes: dict[str, int] = {}
+        self._file = None
+        return None
+
+    def lane(self, name: Optional[str]) -> int:
+        """
+        Map a lane name, usually a device address, to a trace thread id.
+        """
+        tid = self._lanes.get(name)
+        if tid is None:
+            tid = self._lanes[name] = len(self._lanes) + 1
+            self._record(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self.pid,
+                    "tid": tid,
+                    "args": {"name": str(name)},
+                }
+            )
+        return tid
+
+    def span(self, name: str, cat: str, lane: str = None, **args) -> _Span:
+        return _Span(self, name, cat, self.lane(lane), args)
+
+    def instant(self, name: str, cat: str, lane: str = None, **args) -> None:
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "i",
+            "s": "t",
+            "ts": time.perf_counter_ns() / 1000,
+            "pid": self.pid,
+            "tid": self.lane(lane),
+        }
+        if args:
+            event["args"] = args
+        self._record(event)
+
+    def _record(self, event: dict) -> None:
+        self._events.append(event)
+        if len(self._events) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        将缓存的事件写入文件。
+        Write the buffered events to the file.
+        """
+        if not self._events:
+            return None
+        if self._file is None:
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._file.write("[\n")
+        else:
+            self._file.write(",\n")
+        self._file.write(",\n".join(json.dumps(event) for event in self._events))
+        self._file.flush()
+        logger.debug(f"Flushed {len(self._events)} trace events to {self.path}")
+        self._events.clear()
+        return None
+
+    def close(self) -> None:
+        """
+        写入剩余事件并关闭文件。
+        Flush the remaining events and close the file.
+        """
+        self.flush()
+        if self._file is not None:
+            self._file.write("\n]\n")
+            self._file.close()
+            self._file = None
+        return None
+
+
+_tracer: Optional[Tracer] = None
+
+
+def enable(path: str, buffer_size: int = 4096) -> Tracer:
+    """
+    开启追踪。
+    Start tracing into `path`.
+
+    Args:
+        path (str): 输出文件路径
+        buffer_size (int): 缓存多少个事件后写入一次
+
+    Returns:
+        Tracer: 追踪器
+    """
+    global _tracer
+    disable()
+    _tracer = Tracer(path, buffer_size)
+    return _tracer
+
+
+def disable() -> None:
+    """
+    关闭追踪并写入剩余事件。
+    Stop tracing and flush the remaining events.
+    """
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+        _tracer = None
+    return None
+
+
+def span(name: str, cat: str, lane: str = None, **args):
+    # Kept as cheap as possible while tracing is off, this is on the hot path.
+    if _tracer is None:
+        return _NULL_SPAN
+    return _tracer.span(name, cat, lane, **args)
+
+
+def instant(name: str, cat: str, lane: str = None, **args) -> None:
+    if _tracer is not None:
+        _tracer.instant(name, cat, lane, **args)
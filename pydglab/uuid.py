@@ -33,3 +33,7 @@ class CoyoteV3(object):
     characteristicNotify: Union[str, BleakGATTCharacteristic] = (
         "0000150B-0000-1000-8000-00805f9b34fb"
     )
+    serviceBattery: str = "0000180a-0000-1000-8000-00805f9b34fb"
+    characteristicBattery: Union[str, BleakGATTCharacteristic] = (
+        "00001500-0000-1000-8000-00805f9b34fb"
+    )
@@ -0,0 +1,188 @@
+"""
+In-process simulated Coyote endpoints, standing in for BleakClient.
+
+    client = VirtualClient("virtual-0", version=3, latency=0.0075)
+    dglab_instance = pydglab.dglab_v3(client.address, client=client)
+    await dglab_instance.create()
+
+    client.simulate_disconnect()  # the link drops, the device gets a "disconnect" event
+"""
+
+import logging, asyncio, random
+from typing import Callable, Optional
+
+from pydglab.uuid import CoyoteV2, CoyoteV3
+
+logger = logging.getLogger(__name__)
+
+
+def _uuid(characteristic) -> str:
+    return str(getattr(characteristic, "uuid", characteristic)).lower()
+
+
+class VirtualCharacteristic(object):
+    __slots__ = ("uuid", "properties")
+
+    def __init__(self, uuid: str, properties: tuple) -> None:
+        self.uuid = uuid
+        self.properties = list(properties)
+
+    def __str__(self) -> str:
+        return self.uuid
+
+
+class VirtualService(object):
+    __slots__ = ("uuid",)
+
+    def __init__(self, uuid: str) -> None:
+        self.uuid = uuid
+
+
+class VirtualServices(object):
+    """
+    Just enough of BleakGATTServiceCollection for the drivers.
+    """
+
+    def __init__(self, services: tuple, characteristics: tuple) -> None:
+        self._services = tuple(VirtualService(uuid) for uuid in services)
+        self.characteristics = dict(enumerate(characteristics))
+        self.by_uuid = {_uuid(i): i for i in characteristics}
+
+    def __iter__(self):
+        return iter(self._services)
+
+
+class VirtualClient(object):
+    """
+    A simulated Coyote v2/v3 with configurable write latency, jitter and drop rate.
+
+    Dropped writes are lost silently, like a write without response would be.
+    A v3 endpoint answers every 0xB0 carrying a serial number with 0xB1.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        version: int = 3,
+        latency: float = 0.0075,
+        jitter: float = 0.0,
+        drop_rate: float = 0.0,
+        battery: int = 100,
+        seed: Optional[int] = None,
+        disconnected_callback: Callable = None,
+    ) -> None:
+        self.address = address
+        self.version = version
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.battery = battery
+        self.disconnected_callback = disconnected_callback
+        self.is_connected = False
+        self.writes: int = 0
+        self.dropped: int = 0
+        self.last_packet: dict[str, bytes] = {}
+        self._random = random.Random(seed)
+        self._notify: dict[str, Callable] = {}
+        if version == 2:
+            self.services = VirtualServices(
+                (CoyoteV2.serviceBattery, CoyoteV2.serviceEStim),
+                (
+                    VirtualCharacteristic(CoyoteV2.characteristicBattery, ("read", "notify")),
+                    VirtualCharacteristic(
+                        CoyoteV2.characteristicEStimPower, ("read", "write", "notify")
+                    ),
+                    VirtualCharacteristic(CoyoteV2.characteristicEStimA, ("read", "write")),
+                    VirtualCharacteristic(CoyoteV2.characteristicEStimB, ("read", "write")),
+                ),
+            )
+            self._power = bytearray(3)
+        else:
+            self.services = VirtualServices(
+                (CoyoteV3.serviceWrite, CoyoteV3.serviceNotify, CoyoteV3.serviceBattery),
+                (
+                    VirtualCharacteristic(
+                        CoyoteV3.characteristicWrite, ("write-without-response", "write")
+                    ),
+                    VirtualCharacteristic(CoyoteV3.characteristicNotify, ("notify",)),
+                    VirtualCharacteristic(CoyoteV3.characteristicBattery, ("read", "notify")),
+                ),
+            )
+        return None
+
+    async def connect(self, **kwargs) -> bool:
+        self.is_connected = True
+        return True
+
+    async def disconnect(self) -> bool:
+        self.simulate_disconnect()
+        return True
+
+    def simulate_disconnect(self) -> None:
+        """
+        模拟连接断开，之后的写入将丢失。
+        Drop the link as if the device went out of range, later writes are lost.
+        """
+        if not self.is_connected:
+            return None
+        self.is_connected = False
+        self._notify.clear()
+        if self.disconnected_callback is not None:
+            self.disconnected_callback(self)
+        return None
+
+    async def _air(self) -> bool:
+        if not self.is_connected:
+            self.dropped += 1
+            return False
+        delay = self.latency
+        if self.jitter:
+            delay += self._random.uniform(0, self.jitter)
+        await asyncio.sleep(delay)
+        if self.drop_rate and self._random.random() < self.drop_rate:
+            self.dropped += 1
+            return False
+        return True
+
+    async def write_gatt_char(self, characteristic, data, response: bool = None) -> None:
+        if not await self._air():
+            return None
+        uuid = _uuid(characteristic)
+        data = bytes(data)
+        self.writes += 1
+        self.last_packet[uuid] = data
+        if self.version == 2 and uuid == _uuid(CoyoteV2.characteristicEStimPower):
+            self._power = bytearray(data)
+            self._emit(uuid, bytearray(data))
+        elif self.version == 3 and data[0] == 0xB0 and data[1] >> 4:
+            self._emit(
+                _uuid(CoyoteV3.characteristicNotify),
+                bytearray((0xB1, data[1] >> 4, data[2], data[3])),
+            )
+        return None
+
+    async def read_gatt_char(self, characteristic) -> bytearray:
+        await self._air()
+        uuid = _uuid(characteristic)
+        if uuid in (_uuid(CoyoteV2.characteristicBattery), _uuid(CoyoteV3.characteristicBattery)):
+            return bytearray((self.battery,))
+        if self.version == 2 and uuid == _uuid(CoyoteV2.characteristicEStimPower):
+            return bytearray(self._power)
+        return bytearray(self.last_packet.get(uuid, b""))
+
+    async def start_notify(self, characteristic, callback: Callable, **kwargs) -> None:
+        self._notify[_uuid(characteristic)] = callback
+        return None
+
+    async def stop_notify(self, characteristic) -> None:
+        self._notify.pop(_uuid(characteristic), None)
+        return None
+
+    def _emit(self, uuid: str, data: bytearray) -> None:
+        callback = self._notify.get(uuid)
+        if callback is None:
+            return None
+        result = callback(self.services.by_uuid[uuid], data)
+        if asyncio.iscoroutine(result):
+            asyncio.ensure_future(result)
+        return None
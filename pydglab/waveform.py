@@ -0,0 +1,156 @@
+"""
+Wave sets with statistics computed once, when they are loaded.
+
+Two kinds of items are understood:
+- (X, Y, Z) wave tuples: X pulses of 1ms, then Y ms pause, pulse width Z*5us.
+- (frequency, intensity) v3 sub-frames of 25ms, frequency byte 10-240, intensity 0-100.
+
+Intensities are normalized to 0-1 so one budget fits both kinds. What Z
+means full intensity depends on the device, see WAVE_Z_MAX and WAVE_Z_MAX_V3.
+"""
+
+from typing import NamedTuple
+
+# Largest Z a v2 wave tuple can carry (5 bits).
+WAVE_Z_MAX = 31
+# v3 plays Z as intensity Z*5, see dglab_v3.waveset_converter, so Z=20 is 100%.
+WAVE_Z_MAX_V3 = 20
+
+
+class WaveStats(NamedTuple):
+    # Ticks one pass takes, a frame set plays four items per tick.
+    ticks: float
+    peak: float
+    mean: float
+    duty: float
+    frequency_min: float
+    frequency_max: float
+    # Sum of intensity * duty over one pass, in full-scale-tick units.
+    energy: float
+
+    @property
+    def energy_per_tick(self) -> float:
+        return self.energy / self.ticks if self.ticks else 0.0
+
+
+EMPTY_STATS = WaveStats(0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+
+def frame_period(frequency: int) -> float:
+    """
+    Decode a v3 frequency byte into a pulse period in ms.
+    """
+    if frequency <= 100:
+        return float(frequency)
+    if frequency <= 200:
+        return (frequency - 100) * 5.0 + 100
+    return (frequency - 200) * 10.0 + 600
+
+
+def wave_stats(wave_set, z_max: int = WAVE_Z_MAX) -> WaveStats:
+    """
+    Statistics of (X, Y, Z) wave tuples, one tuple per tick, Z normalized by `z_max`.
+    """
+    if not wave_set:
+        return EMPTY_STATS
+    x, y, z = zip(*wave_set)
+    periods = [a + b for a, b in zip(x, y)]
+    duties = [a / p if p else 0.0 for a, p in zip(x, periods)]
+    intensities = [min(c, z_max) / z_max for c in z]
+    frequencies = [1000 / p for p in periods if p]
+    return WaveStats(
+        len(wave_set),
+        max(intensities),
+        sum(intensities) / len(intensities),
+        sum(duties) / len(duties),
+        min(frequencies, default=0.0),
+        max(frequencies, default=0.0),
+        sum(i * d for i, d in zip(intensities, duties)),
+    )
+
+
+def frame_stats(frame_set) -> WaveStats:
+    """
+    Statistics of (frequency, intensity) sub-frames, four sub-frames per tick.
+    """
+    if not frame_set:
+        return EMPTY_STATS
+    frequencies, intensities = zip(*frame_set)
+    intensities = [min(max(i, 0), 100) / 100 for i in intensities]
+    hertz = [1000 / frame_period(min(max(f, 10), 240)) for f in frequencies]
+    return WaveStats(
+        len(frame_set) / 4,
+        max(intensities),
+        sum(intensities) / len(intensities),
+        sum(1 for i in intensities if i) / len(intensities),
+        min(hertz),
+        max(hertz),
+        # Each sub-frame is a quarter of a tick.
+        sum(intensities) / 4,
+    )
+
+
+class WaveSet(tuple):
+    """
+    An immutable wave set or frame set, carrying its `stats`.
+    `z_max` is the Z of a full intensity wave tuple on the device it is meant for.
+    """
+
+    def __new__(cls, items=(), z_max: int = WAVE_Z_MAX):
+        self = super().__new__(cls, (tuple(item) for item in items))
+        self.z_max = z_max
+        if self and len(self[0]) == 2:
+            self.stats = frame_stats(self)
+        else:
+            self.stats = wave_stats(self, z_max)
+        return self
+
+    def scaled(self, factor: float) -> "WaveSet":
+        """
+        Scale the intensity of every item by `factor`.
+        """
+        if self and len(self[0]) == 2:
+            return WaveSet(((f, int(i * factor)) for f, i in self), self.z_max)
+        return WaveSet(((x, y, int(z * factor)) for x, y, z in self), self.z_max)
+
+
+def as_wave_set(items, z_max: int = WAVE_Z_MAX) -> WaveSet:
+    # pydglab.pattern builds on this module.
+    from pydglab.pattern import Pattern
+
+    if isinstance(items, WaveSet):
+        return items if items.z_max == z_max else WaveSet(items, z_max)
+    # A lazy Pattern is kept as is, it is only compiled when a budget needs its stats.
+    return items if isinstance(items, Pattern) else WaveSet(items, z_max)
+
+
+class WaveSetSlot(object):
+    """
+    Descriptor for the channelN_wave_set attributes of a device.
+
+    Every assigned set is wrapped into a WaveSet, so its statistics are
+    computed once, and checked against the device's `safety_budget`.
+    """
+
+    def __init__(self, z_max: int = WAVE_Z_MAX) -> None:
+        self.z_max = z_max
+
+    def __set_name__(self, owner, name: str) -> None:
+        self.attr = "_" + name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return getattr(obj, self.attr)
+
+    def __set__(self, obj, value) -> None:
+        setattr(obj, self.attr, self.load(obj, value))
+
+    def load(self, obj, value):
+        """
+        `value` as it would be stored on `obj`, wrapped and checked against its budget.
+        """
+        budget = getattr(obj, "safety_budget", None)
+        if budget is None:
+            return as_wave_set(value, self.z_max)
+        return budget.admit(value, self.z_max)
@@ -0,0 +1,45 @@
+import asyncio, threading
+
+import pytest
+
+from pydglab.adapter import AdapterGroup
+
+
+def test_cap_holds_across_loops():
+    group = AdapterGroup("test", max_inflight=2)
+    peak = []
+
+    async def write():
+        async with group:
+            peak.append(group._inflight)
+            await asyncio.sleep(0.001)
+
+    async def device(writes):
+        tasks = [asyncio.create_task(write()) for _ in range(writes)]
+        await asyncio.sleep(0)
+        # Cancelled while waiting, their slots must not leak.
+        for task in tasks[:5]:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    threads = [threading.Thread(target=asyncio.run, args=(device(50),)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
+    assert group._inflight == 0
+    assert not group._waiters
+
+
+def test_cap_change_rejected_while_busy():
+    group = AdapterGroup("test", max_inflight=2)
+
+    async def write():
+        async with group:
+            with pytest.raises(Exception, match="in flight"):
+                group.set_max_inflight(4)
+
+    asyncio.run(write())
+    group.set_max_inflight(4)
+    assert group.max_inflight == 4
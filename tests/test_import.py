@@ -0,0 +1,32 @@
+import json, os, subprocess, sys
+
+# Generous, a cold `import pydglab` takes a few tens of ms; bleak alone takes hundreds.
+IMPORT_TIME_LIMIT = 0.5
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import pydglab
+elapsed = time.perf_counter() - started
+print(json.dumps({"elapsed": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def _cold_import() -> dict:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root)
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE], env=env, cwd=root, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout)
+
+
+def test_import_is_lazy():
+    modules = _cold_import()["modules"]
+    assert "bleak" not in modules
+    assert "bitstring" not in modules
+    assert "pydglab.service" not in modules
+
+
+def test_import_is_fast():
+    assert _cold_import()["elapsed"] < IMPORT_TIME_LIMIT
@@ -0,0 +1,50 @@
+import asyncio
+
+from pydglab.clock import VirtualClock
+from pydglab.scheduler import TickScheduler
+
+
+def _run(pushes_at, duration=1.0):
+    clock = VirtualClock()
+    ticks, pushes = [], []
+
+    async def tick(skipped):
+        ticks.append(round(clock.monotonic(), 6))
+
+    async def push():
+        pushes.append(round(clock.monotonic(), 6))
+
+    async def main():
+        scheduler = TickScheduler(tick, 0.1, clock=clock, push=push)
+        scheduler.set_phase(0.03)
+        task = asyncio.create_task(scheduler.run())
+        elapsed = 0.0
+        for at in pushes_at:
+            await asyncio.sleep(at - elapsed)
+            elapsed = at
+            scheduler.push_now()
+        await asyncio.sleep(duration - elapsed)
+        task.cancel()
+        return scheduler
+
+    scheduler = clock.run(main())
+    return ticks, pushes, scheduler
+
+
+def test_push_keeps_ticks():
+    baseline, _, _ = _run(())
+    ticks, pushes, scheduler = _run((0.35,))
+    # Same frames at the same deadlines, the push only resends.
+    assert ticks == baseline
+    assert pushes == [0.35]
+    assert scheduler.ticks == len(baseline)
+
+
+def test_pushes_coalesced_per_period():
+    baseline, _, _ = _run(())
+    # A 50Hz slider.
+    ticks, pushes, scheduler = _run([0.2 + i * 0.02 for i in range(25)])
+    assert ticks == baseline
+    assert scheduler.immediate == len(pushes)
+    assert all(b - a >= 0.1 - 1e-9 for a, b in zip(pushes, pushes[1:]))
+    assert len(pushes) <= 6
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from pydglab import model_v2
+from pydglab.clock import VirtualClock
+from pydglab.recorder import read_column
+from pydglab.service import dglab, dglab_v3
+from pydglab.virtual import VirtualClient
+
+
+def test_simulated_disconnect_reaches_the_device():
+    clock = VirtualClock()
+
+    async def session(driver, version):
+        client = VirtualClient(f"virtual-{version}", version=version)
+        device = await driver(client.address, client=client, clock=clock).create()
+        subscription = device.events.subscribe(kinds=("disconnect",))
+        client.simulate_disconnect()
+        event = await asyncio.wait_for(subscription.get(), 1)
+        await device.close()
+        return event, client
+
+    for driver, version in ((dglab, 2), (dglab_v3, 3)):
+        event, client = clock.run(session(driver, version))
+        assert event.address == client.address
+        assert not client.is_connected
+
+
+def test_v2_strength_survives_notifications():
+    clock = VirtualClock()
+
+    async def session():
+        device = await dglab("virtual-2", client=VirtualClient("virtual-2", version=2), clock=clock).create()
+        await device.set_strength_sync(100, 100)
+        for _ in range(10):
+            await device.set_strength(100, model_v2.ChannelA)
+            await asyncio.sleep(0.05)
+        await device.set_strength_sync(30, 40)
+        await asyncio.sleep(0.2)
+        targets = device.coyote.ChannelA.strength, device.coyote.ChannelB.strength
+        reported = await device.get_strength()
+        await device.close()
+        return targets, reported
+
+    targets, reported = clock.run(session())
+    assert targets == (30, 40)
+    assert reported == (30, 40)
+
+
+def test_strength_events_only_on_change():
+    clock = VirtualClock()
+
+    async def session(driver, version):
+        client = VirtualClient(f"virtual-{version}", version=version)
+        device = await driver(client.address, client=client, clock=clock).create()
+        subscription = device.events.subscribe(maxsize=16, overflow="close", kinds=("strength",))
+        await device.set_strength_sync(10, 20)
+        await asyncio.sleep(3)
+        events = []
+        while (event := subscription.get_nowait()) is not None:
+            events.append(event.data)
+        closed = subscription.closed
+        await device.close()
+        return events, closed
+
+    for driver, version in ((dglab, 2), (dglab_v3, 3)):
+        events, closed = clock.run(session(driver, version))
+        assert events == [(10, 20)]
+        assert not closed
+
+
+def test_recording_survives_out_of_range_values(tmp_path):
+    clock = VirtualClock()
+
+    async def session():
+        client = VirtualClient("virtual-2", version=2)
+        device = await dglab(client.address, client=client, clock=clock).create()
+        recorder = device.start_recording(str(tmp_path / "session"), chunk_size=4)
+        await asyncio.sleep(0.5)
+        # Raw v2 units leaking into the reported strength.
+        device.reported_strength = (2047, 300)
+        ticks = device.scheduler.ticks
+        await asyncio.sleep(0.5)
+        alive = device.scheduler.ticks > ticks
+        with pytest.raises(ValueError):
+            recorder.append(clock.time(), 1, 0, 0, 0, 0, (1, 2), (1, 2, 3))
+        device.stop_recording(pack=False)
+        await device.close()
+        return alive, recorder
+
+    alive, recorder = clock.run(session())
+    assert alive
+    assert recorder.saturated > 0
+    for name in recorder.columns:
+        shape, _ = read_column(str(tmp_path / "session" / f"{name}.npy"))
+        assert shape[0] == recorder.rows
@@ -0,0 +1,82 @@
+import pytest
+
+from pydglab import model_v2, model_v3
+from pydglab.pattern import UNKNOWN_STATS, clamp, pattern, repeat
+from pydglab.safety import BudgetExceeded, SafetyBudget
+from pydglab.service import dglab, dglab_v3
+from pydglab.virtual import VirtualClient
+from pydglab.waveform import WAVE_Z_MAX, WAVE_Z_MAX_V3, WaveSet
+
+
+def test_v2_full_intensity_is_z_31():
+    device = dglab("v2", client=VirtualClient("v2", version=2))
+    device.channelA_wave_set = [(5, 95, WAVE_Z_MAX)]
+    assert device.channelA_wave_set.stats.peak == 1.0
+
+    device.channelA_wave_set = [(5, 95, 20)]
+    assert device.channelA_wave_set.stats.peak < 1.0
+
+
+def test_v3_full_intensity_is_z_20():
+    device = dglab_v3("v3", client=VirtualClient("v3"))
+    device.channelA_wave_set = model_v3.Wave_set["Going_Faster"]
+    assert device.channelA_wave_set.stats.peak == 1.0
+    # The same Z converts to 100% intensity on the device.
+    assert device.waveset_converter((5, 95, WAVE_Z_MAX_V3))[1] == 100
+
+
+def test_v3_budget_rejects_full_intensity():
+    device = dglab_v3("v3", client=VirtualClient("v3"), safety_budget=SafetyBudget(max_peak=0.9))
+    with pytest.raises(BudgetExceeded, match="peak 1.00"):
+        device.channelA_wave_set = [(5, 95, 20)]
+
+
+def test_wave_set_rewrapped_for_other_device():
+    wave_set = WaveSet(model_v2.Wave_set["Going_Faster"])
+    device = dglab_v3("v3", client=VirtualClient("v3"))
+    device.channelA_wave_set = wave_set
+    assert device.channelA_wave_set.z_max == WAVE_Z_MAX_V3
+    assert device.channelA_wave_set == wave_set
+
+
+def test_clamp_uses_device_z_max():
+    frames = list(clamp(pattern([(5, 95, 30)]), 0.5, WAVE_Z_MAX_V3))
+    assert frames == [(5, 95, 10)]
+
+
+def test_infinite_pattern_is_not_compiled_on_assignment():
+    calls = []
+
+    def frames():
+        calls.append(1)
+        while True:
+            yield (5, 95, 20)
+
+    device = dglab("v2", client=VirtualClient("v2", version=2))
+    device.channelA_wave_set = pattern(frames)
+    assert calls == []
+
+
+def test_infinite_pattern_clamped_to_mean():
+    budget = SafetyBudget(max_peak=0.8, max_mean=0.5)
+    admitted = budget.admit(repeat([(10, 100)]))
+    assert next(iter(admitted)) == (10, 50)
+
+
+def test_admitted_infinite_pattern_not_compiled_per_tick():
+    calls = []
+
+    def frames():
+        calls.append(1)
+        while True:
+            yield (10, 100)
+
+    admitted = SafetyBudget(max_peak=0.8, max_mean=0.5).admit(pattern(frames))
+    calls.clear()
+    assert admitted.stats is UNKNOWN_STATS
+    assert calls == []
+
+
+def test_infinite_pattern_rejected_for_duty():
+    with pytest.raises(BudgetExceeded, match="Duty cycle"):
+        SafetyBudget(max_duty=0.5).admit(repeat([(10, 100)]))